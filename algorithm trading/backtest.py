@@ -0,0 +1,137 @@
+"""
+Vectorized backtester for the SMA crossover strategy.
+Signals are turned into positions, and a batch of strategies on the same
+prices is simulated at once as a (strategies, bars) array. The outputs are
+equity curves, drawdowns, performance metrics and trade lists. Fees and
+slippage are charged as a fraction of the traded value on every position
+change.
+"""
+import numpy as np
+import pandas as pd
+
+# Broker fee and slippage, as a fraction of the traded value
+FEE_RATE = 0.001
+SLIPPAGE_RATE = 0.0005
+TRADING_DAYS_PER_YEAR = 252
+
+def carry_forward(state):
+    """
+    Replace the zeros of a state array with the last non-zero state before them
+
+    Args:
+        state (np.ndarray): States of shape (n,) or (strategies, n), 0 meaning no change
+
+    Returns:
+        np.ndarray: Array of the same shape, 0 until the first non-zero state
+    """
+    state = np.asarray(state)
+    last = np.where(state != 0, np.arange(state.shape[-1]), 0)
+    last = np.maximum.accumulate(last, axis=-1)
+    return np.take_along_axis(state, last, axis=-1)
+
+def signals_to_positions(buy_signals, sell_signals):
+    """
+    Long-only positions from the Buy Signals / sell signals columns of main.py
+
+    Args:
+        buy_signals (np.ndarray): Close price on buy bars and NaN elsewhere, (n,) or (strategies, n)
+        sell_signals (np.ndarray): Close price on sell bars and NaN elsewhere, same shape
+
+    Returns:
+        np.ndarray: 1.0 from a buy bar to the next sell bar, 0.0 otherwise
+    """
+    state = (~np.isnan(buy_signals)).astype(np.int8) - (~np.isnan(sell_signals)).astype(np.int8)
+    return (carry_forward(state) > 0).astype(float)
+
+def backtest(close, positions, fee_rate=FEE_RATE, slippage_rate=SLIPPAGE_RATE,
+             periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Simulate a batch of strategies trading one price series.
+    A position taken at the close of a bar earns the return of the next bar,
+    and every position change costs abs(change) * (fee_rate + slippage_rate).
+
+    Args:
+        close (np.ndarray): Close prices, shape (n,)
+        positions (np.ndarray): Target exposure at each close, e.g. 1 long / 0 flat / -1 short,
+            shape (n,) or (strategies, n)
+        fee_rate (float): Fee per traded value
+        slippage_rate (float): Slippage per traded value
+        periods_per_year (int): Bars per year, to annualize the metrics
+
+    Returns:
+        dict: (strategies, n) arrays returns, equity (starting at 1), drawdown and costs,
+        and metrics, a DataFrame with one row per strategy
+    """
+    close = np.asarray(close, dtype=float).ravel()
+    positions = np.atleast_2d(np.asarray(positions, dtype=float))
+
+    bar_returns = np.zeros(len(close))
+    bar_returns[1:] = close[1:] / close[:-1] - 1
+
+    changes = np.diff(positions, axis=1, prepend=0.0)
+    costs = np.abs(changes) * (fee_rate + slippage_rate)
+    growth = np.ones_like(positions)
+    growth[:, 1:] += positions[:, :-1] * bar_returns[1:]
+    growth *= 1 - costs
+    returns = growth - 1
+
+    equity = np.cumprod(growth, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+
+    years = max(len(close) - 1, 1) / periods_per_year
+    std = returns[:, 1:].std(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, returns[:, 1:].mean(axis=1) / std * np.sqrt(periods_per_year), np.nan)
+    entries = (positions != 0) & (changes != 0)
+
+    metrics = pd.DataFrame({
+        'total_return': equity[:, -1] - 1,
+        'cagr': np.power(np.maximum(equity[:, -1], 0), 1 / years) - 1,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=1),
+        'trades': entries.sum(axis=1),
+        'exposure': (positions != 0).mean(axis=1),
+        'costs': costs.sum(axis=1)
+    })
+    return {'returns': returns, 'equity': equity, 'drawdown': drawdown, 'costs': costs, 'metrics': metrics}
+
+def trade_list(close, positions, index=None, fee_rate=FEE_RATE, slippage_rate=SLIPPAGE_RATE):
+    """
+    Trades of one strategy: every run of the same non-zero position
+
+    Args:
+        close (np.ndarray): Close prices, shape (n,)
+        positions (np.ndarray): Positions of the strategy, shape (n,)
+        index (pd.Index): Bar times, the bar numbers if None
+        fee_rate (float): Fee per traded value
+        slippage_rate (float): Slippage per traded value
+
+    Returns:
+        pd.DataFrame: entry/exit time and price after slippage, side, bars held,
+        return after fees, and open=True for a trade still held at the last bar
+    """
+    close = np.asarray(close, dtype=float).ravel()
+    positions = np.asarray(positions, dtype=float).ravel()
+    index = pd.RangeIndex(len(close)) if index is None else pd.Index(index)
+
+    changes = np.flatnonzero(np.diff(positions, prepend=0.0) != 0)
+    ends = np.append(changes[1:], len(close) - 1)
+    held = positions[changes] != 0
+    still_open = np.zeros(len(changes), dtype=bool)
+    still_open[-1:] = positions[-1] != 0
+    entries, exits = changes[held], ends[held]
+    side = positions[entries]
+    direction = np.sign(side)
+
+    entry_price = close[entries] * (1 + direction * slippage_rate)
+    exit_price = close[exits] * (1 - direction * slippage_rate)
+    return pd.DataFrame({
+        'entry_time': index[entries],
+        'exit_time': index[exits],
+        'side': side,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'bars': exits - entries,
+        'return': direction * (exit_price / entry_price - 1) - 2 * fee_rate,
+        'open': still_open[held]
+    })
@@ -0,0 +1,178 @@
+"""
+Chart rendering for the SMA crossover strategy.
+Lines are decimated to about two points per pixel column, keeping the min and
+max of every column so spikes stay visible, before they reach matplotlib.
+Charts are either shown in interactive windows, as main.py always did, or
+written as PNG/SVG files with no GUI backend involved, which also allows
+rendering the charts of many tickers in parallel processes.
+
+Usage:
+    python charts.py META AAPL MSFT --output-dir charts --format svg
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import matplotlib.style
+import numpy as np
+
+CHART_WIDTH_PX = 1200
+CHART_HEIGHT_PX = 600
+CHART_DPI = 100
+CHART_STYLE = "dark_background"
+
+def minmax_indices(values, n_bins):
+    """
+    Indices of the min and max value of n_bins equal chunks of a series, plus its ends
+
+    Args:
+        values (np.ndarray): Series to decimate
+        n_bins (int): Number of chunks, usually the plot width in pixels
+
+    Returns:
+        np.ndarray: Sorted indices, every index if the series has at most 2 * n_bins values
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    n = len(values)
+    if n <= 2 * n_bins:
+        return np.arange(n)
+
+    size = -(-n // n_bins)
+    chunks = np.full(-(-n // size) * size, np.nan)
+    chunks[:n] = values
+    chunks = chunks.reshape(-1, size)
+    missing = np.isnan(chunks)
+    offsets = np.arange(len(chunks)) * size
+    lows = np.where(missing, np.inf, chunks).argmin(axis=1) + offsets
+    highs = np.where(missing, -np.inf, chunks).argmax(axis=1) + offsets
+
+    indices = np.unique(np.concatenate((lows, highs, [0, n - 1])))
+    return indices[indices < n]
+
+def plot_line(ax, index, values, n_bins, **kwargs):
+    """
+    Plot a min/max decimated series
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    keep = minmax_indices(values, n_bins)
+    ax.plot(index[keep], values[keep], **kwargs)
+
+def plot_price(ax, data, ticker, ma_1, ma_2, n_bins):
+    """
+    First chart of main.py: close price and both moving averages
+    """
+    index = data.index.to_numpy()
+    plot_line(ax, index, data['Close'], n_bins, label=f"Share Price {ticker}", color="lightgray")
+    plot_line(ax, index, data[f'SMA_{ma_1}'], n_bins, label=f"SMA_{ma_1}", color="orange")
+    plot_line(ax, index, data[f'SMA_{ma_2}'], n_bins, label=f"SMA_{ma_2}", color="purple")
+    ax.legend(loc="upper left")
+
+def plot_signals(ax, data, ticker, ma_1, ma_2, n_bins):
+    """
+    Second chart of main.py: price, moving averages and the buy/sell signals
+    """
+    index = data.index.to_numpy()
+    plot_line(ax, index, data['Close'], n_bins, label=f"Share Price {ticker}", alpha=0.5)
+    plot_line(ax, index, data[f'SMA_{ma_1}'], n_bins, label=f"SMA_{ma_1}", color="orange", linestyle="--")
+    plot_line(ax, index, data[f'SMA_{ma_2}'], n_bins, label=f"SMA_{ma_2}", color="pink", linestyle="--")
+    # Signals are sparse, only the signal bars are drawn
+    for column, label, marker, color in [('Buy Signals', "Buy Signal", "^", "#00ff00"),
+                                         ('sell signals', "Sell Signal", "v", "#ff0000")]:
+        signals = data[column].dropna()
+        ax.scatter(signals.index.to_numpy(), signals.to_numpy(), label=label, marker=marker, color=color, lw=3)
+    ax.legend(loc="upper left")
+
+def render_charts(data, ticker, ma_1, ma_2, output_dir=None, fmt='png',
+                  width_px=CHART_WIDTH_PX, height_px=CHART_HEIGHT_PX, dpi=CHART_DPI):
+    """
+    Draw the price and the signal charts of a ticker
+
+    Args:
+        data (pd.DataFrame): Output of main.add_signals
+        ticker (str): Ticker symbol
+        ma_1 (int): Fast window
+        ma_2 (int): Slow window
+        output_dir (str): Directory of the chart files, the charts are shown interactively if None
+        fmt (str): 'png' or 'svg'
+        width_px (int): Chart width in pixels, the lines are decimated to it
+        height_px (int): Chart height in pixels
+        dpi (int): Resolution of the PNG files
+
+    Returns:
+        list: Paths of the written files, empty when shown interactively
+    """
+    figsize = (width_px / dpi, height_px / dpi)
+    charts = [('price', plot_price), ('signals', plot_signals)]
+
+    if output_dir is None:
+        import matplotlib.pyplot as plt
+
+        with matplotlib.style.context(CHART_STYLE):
+            for _, plot in charts:
+                fig = plt.figure(figsize=figsize)
+                plot(fig.gca(), data, ticker, ma_1, ma_2, width_px)
+                plt.show()
+        return []
+
+    # A bare Figure renders through the Agg/SVG canvas without pyplot or a GUI backend
+    from matplotlib.figure import Figure
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    with matplotlib.style.context(CHART_STYLE):
+        for name, plot in charts:
+            fig = Figure(figsize=figsize, dpi=dpi)
+            plot(fig.add_subplot(), data, ticker, ma_1, ma_2, width_px)
+            path = os.path.join(output_dir, f"{ticker}_{name}.{fmt}")
+            fig.savefig(path, format=fmt)
+            paths.append(path)
+    return paths
+
+def render_ticker(ticker, output_dir, ma_1, ma_2, years=3, fmt='png', offline=True):
+    """
+    Load a ticker from the price cache, add the signals and write its charts
+
+    Returns:
+        list: Paths of the written files
+    """
+    import datetime as dt
+    from main import add_signals
+    from price_cache import PriceCache
+
+    end = dt.datetime.now()
+    start = end - dt.timedelta(days=365 * years)
+    data = add_signals(PriceCache(offline=offline).download(ticker, start=start, end=end), ma_1, ma_2)
+    return render_charts(data, ticker, ma_1, ma_2, output_dir, fmt)
+
+def _render_ticker(task):
+    try:
+        return render_ticker(*task)
+    except Exception as e:
+        print(f"Error rendering {task[0]}: {str(e)}")
+        return []
+
+def render_batch(tickers, output_dir, ma_1, ma_2, years=3, fmt='png', offline=True, max_workers=None):
+    """
+    Render the charts of many tickers with a process pool
+
+    Returns:
+        list: Paths of the written files
+    """
+    tasks = [(ticker, output_dir, ma_1, ma_2, years, fmt, offline) for ticker in tickers]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return [path for paths in executor.map(_render_ticker, tasks) for path in paths]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render SMA crossover charts of many tickers")
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--output-dir', default='charts')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    parser.add_argument('--ma-1', type=int, default=30)
+    parser.add_argument('--ma-2', type=int, default=100)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--online', action='store_true', help="download bars missing from the price cache")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    paths = render_batch(args.tickers, args.output_dir, args.ma_1, args.ma_2, args.years,
+                         args.format, not args.online, args.workers)
+    print(f"Saved {len(paths)} charts to {args.output_dir}")
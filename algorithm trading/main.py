@@ -1,57 +1,102 @@
+import argparse
 import datetime as dt
-import matplotlib.pyplot as plt
-import yfinance as yf
+import numpy as np
+from backtest import backtest, signals_to_positions, trade_list
+from charts import render_charts
+from price_cache import PriceCache
 
-plt.style.use("dark_background")
 #define moving_average as ma_(suffix)
 ma_1 = 30
 ma_2 = 100
+TICKER = 'META'
+YEARS = 3
+# True to run from the local price cache without network access
+OFFLINE = False
 
-start = dt.datetime.now() - dt.timedelta(days=365 * 3)
-end = dt.datetime.now()
-
-data_meta = yf.download('META', start=start, end=end)
-print(data_meta)
-
-data_meta[f'SMA_{ma_1}'] = data_meta['Close'].rolling(window=ma_1).mean()
-data_meta[f'SMA_{ma_2}'] = data_meta['Close'].rolling(window=ma_2).mean()
-
-data_meta = data_meta.iloc[ma_2:]
-
-plt.figure(figsize=(12,6))
-plt.plot(data_meta['Close'], label="Share Price META", color="lightgray")
-plt.plot(data_meta[f'SMA_{ma_1}'], label=f"SMA_{ma_1}", color="orange")
-plt.plot(data_meta[f'SMA_{ma_2}'], label=f"SMA_{ma_2}", color="purple")
-plt.legend(loc="upper left")
-plt.show()
-
-buy_signals = []
-sell_signals = []
-trigger = 0
-
-for x in range(len(data_meta)):
-    if data_meta[f'SMA_{ma_1}'].iloc[x] > data_meta[f'SMA_{ma_2}'].iloc[x] and trigger != 1:
-        buy_signals.append(data_meta['Close'].iloc[x])
-        sell_signals.append(float('nan'))
-        trigger = 1
-    elif data_meta[f'SMA_{ma_1}'].iloc[x] < data_meta[f'SMA_{ma_2}'].iloc[x]  and trigger != -1:
-        buy_signals.append(float('nan'))
-        sell_signals.append(data_meta['Close'].iloc[x])
-        trigger = -1
-    else:
-        buy_signals.append(float('nan'))
-        sell_signals.append(float('nan'))
-
-data_meta['Buy Signals'] = buy_signals
-data_meta['sell signals'] = sell_signals
-
-print(data_meta)
-
-plt.figure(figsize=(12,6))
-plt.plot(data_meta['Close'], label="Share Price META", alpha=0.5)
-plt.plot(data_meta[f'SMA_{ma_1}'], label=f"SMA_{ma_1}", color="orange", linestyle="--")
-plt.plot(data_meta[f'SMA_{ma_2}'], label=f"SMA_{ma_2}", color="pink", linestyle="--")
-plt.scatter(data_meta.index, data_meta['Buy Signals'], label="Buy Signal", marker="^", color="#00ff00", lw=3)
-plt.scatter(data_meta.index, data_meta['Buy Signals'], label="Sell Signal", marker="v", color="#ff0000", lw=3)
-plt.legend(loc="upper left")
-plt.show()
+def crossover_signals(close, sma_fast, sma_slow):
+    """
+    Buy/sell signals of a moving average crossover, computed in one vectorized pass.
+    A bar gets a signal when the sign of sma_fast - sma_slow changes from the
+    last non-zero sign (the trigger), so the first bar with a non-zero sign
+    is a signal too. Bars where the averages are equal or missing keep the trigger.
+
+    Args:
+        close (pd.Series): Close prices
+        sma_fast (pd.Series): Fast moving average
+        sma_slow (pd.Series): Slow moving average
+
+    Returns:
+        tuple: Buy Signals and sell signals arrays, the close price on signal bars and NaN elsewhere
+    """
+    close = np.asarray(close, dtype=float).ravel()
+    state = np.sign(np.asarray(sma_fast, dtype=float).ravel() - np.asarray(sma_slow, dtype=float).ravel())
+    state[np.isnan(state)] = 0
+
+    # trigger before each bar: the last non-zero state, 0 before the first one
+    nonzero = np.flatnonzero(state)
+    last = np.full(len(state), -1)
+    last[nonzero] = nonzero
+    last = np.maximum.accumulate(last)
+    trigger = np.zeros(len(state) + 1)
+    trigger[1:] = np.where(last >= 0, state[np.maximum(last, 0)], 0)
+    changed = (state != 0) & (state != trigger[:-1])
+
+    buy_signals = np.where(changed & (state > 0), close, np.nan)
+    sell_signals = np.where(changed & (state < 0), close, np.nan)
+    return buy_signals, sell_signals
+
+def add_signals(data, ma_1=ma_1, ma_2=ma_2):
+    """
+    Add the moving averages and the crossover signals to the bars of a ticker
+
+    Args:
+        data (pd.DataFrame): Bars with a Close column
+        ma_1 (int): Fast window
+        ma_2 (int): Slow window
+
+    Returns:
+        pd.DataFrame: Bars from bar ma_2 on with SMA_<ma_1>, SMA_<ma_2>, Buy Signals and sell signals columns
+    """
+    data = data.copy()
+    data[f'SMA_{ma_1}'] = data['Close'].rolling(window=ma_1).mean()
+    data[f'SMA_{ma_2}'] = data['Close'].rolling(window=ma_2).mean()
+
+    data = data.iloc[ma_2:].copy()
+
+    buy_signals, sell_signals = crossover_signals(data['Close'], data[f'SMA_{ma_1}'], data[f'SMA_{ma_2}'])
+    data['Buy Signals'] = buy_signals
+    data['sell signals'] = sell_signals
+    return data
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SMA crossover signals and backtest of one ticker")
+    parser.add_argument('--ticker', default=TICKER)
+    parser.add_argument('--years', type=int, default=YEARS)
+    parser.add_argument('--ma-1', type=int, default=ma_1)
+    parser.add_argument('--ma-2', type=int, default=ma_2)
+    parser.add_argument('--offline', action='store_true', default=OFFLINE, help="use the price cache only")
+    parser.add_argument('--output-dir', help="write the charts as files instead of showing them")
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    args = parser.parse_args(argv)
+
+    end = dt.datetime.now()
+    start = end - dt.timedelta(days=365 * args.years)
+
+    data = PriceCache(offline=args.offline).download(args.ticker, start=start, end=end)
+    print(data)
+
+    data = add_signals(data, args.ma_1, args.ma_2)
+    print(data)
+
+    positions = signals_to_positions(data['Buy Signals'].to_numpy(), data['sell signals'].to_numpy())
+    result = backtest(data['Close'], positions)
+    data['Equity'] = result['equity'][0]
+    print(result['metrics'].to_string(index=False))
+    print(trade_list(data['Close'], positions, data.index).to_string(index=False))
+
+    paths = render_charts(data, args.ticker, args.ma_1, args.ma_2, args.output_dir, args.format)
+    for path in paths:
+        print(f"Saved chart to {path}")
+
+if __name__ == "__main__":
+    main()
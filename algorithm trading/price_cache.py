@@ -0,0 +1,156 @@
+"""
+Local OHLCV store in front of yf.download.
+Bars are kept in one Parquet file per ticker and interval, and index.json
+records the time range each file covers. A request is served from the file
+and only the part of the range outside of it is downloaded: usually just the
+bars since the last run. In offline mode nothing is downloaded.
+"""
+import datetime as dt
+import json
+import os
+import threading
+import pandas as pd
+
+PRICE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_cache')
+
+# The last cached bar is downloaded again, it may have been taken before the close
+TAIL_OVERLAP = {'1d': pd.Timedelta(days=1), '1wk': pd.Timedelta(weeks=1), '1mo': pd.Timedelta(days=31)}
+
+def bar_length(interval):
+    """
+    Duration of one bar of a yfinance interval, e.g. '1d', '1wk' or '5m'
+    """
+    if interval in TAIL_OVERLAP:
+        return TAIL_OVERLAP[interval]
+    return pd.Timedelta(interval.replace('m', 'min') if interval.endswith('m') else interval)
+
+def to_utc_naive(index):
+    """
+    Bar times as naive UTC timestamps, the way they are stored
+    """
+    index = pd.DatetimeIndex(index)
+    return index.tz_convert(None) if index.tz is not None else index
+
+class PriceCache:
+    """
+    Per-ticker Parquet cache of yf.download bars.
+
+    Args:
+        cache_dir (str): directory of the Parquet files and index.json
+        offline (bool): serve from the cache only, never download
+        downloader (callable): yf.download compatible function, yfinance is imported lazily if omitted
+    """
+
+    def __init__(self, cache_dir=PRICE_CACHE_DIR, offline=False, downloader=None):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.downloader = downloader
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+        self._lock = threading.Lock()
+
+    def path(self, ticker, interval='1d'):
+        return os.path.join(self.cache_dir, f"{ticker}_{interval}.parquet")
+
+    def read(self, ticker, interval='1d'):
+        """
+        Returns:
+            pd.DataFrame: every cached bar of the ticker, None if there are none
+        """
+        path = self.path(ticker, interval)
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        """
+        Download bars with yf.download
+
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volume... columns on a naive UTC index
+        """
+        if self.downloader is None:
+            import yfinance as yf
+            self.downloader = yf.download
+        data = self.downloader(ticker, start=start, end=end, interval=interval, auto_adjust=False, progress=False)
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.xs(ticker, axis=1, level=1) if ticker in data.columns.get_level_values(1) else data.droplevel(1, axis=1)
+        data = data.copy()
+        data.index = to_utc_naive(data.index)
+        data.index.name = 'Date'
+        data.columns.name = None
+        return data
+
+    def write(self, ticker, interval, data, start, end):
+        """
+        Replace the cached bars of a ticker and record the range they cover
+        """
+        path = self.path(ticker, interval)
+        tmp_path = f"{path}.tmp"
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.index[f"{ticker}_{interval}"] = {'start': start.isoformat(), 'end': end.isoformat(), 'bars': len(data)}
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+
+    def download(self, ticker, start, end=None, interval='1d'):
+        """
+        Bars of a ticker in [start, end), downloading only what the cache does not cover
+
+        Args:
+            ticker (str): Ticker symbol
+            start (datetime): First bar time
+            end (datetime): End of the range, excluded, now if None
+            interval (str): yfinance interval, e.g. '1d' or '1m'
+
+        Returns:
+            pd.DataFrame: Bars of the range
+        """
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end if end is not None else dt.datetime.now())
+        if interval == '1d':
+            start, end = start.normalize(), end.normalize() + pd.Timedelta(days=1)
+
+        cached = self.read(ticker, interval)
+        covered = self.index.get(f"{ticker}_{interval}")
+
+        if self.offline:
+            if cached is None:
+                raise FileNotFoundError(f"No cached {interval} bars for {ticker} in {self.cache_dir}")
+        else:
+            fetched = []
+            if cached is None or covered is None:
+                fetched.append(self.fetch(ticker, start, end, interval))
+                new_start = new_end = None
+            else:
+                new_start, new_end = pd.Timestamp(covered['start']), pd.Timestamp(covered['end'])
+                if start < new_start:
+                    fetched.append(self.fetch(ticker, start, new_start, interval))
+                if end > new_end:
+                    tail_start = new_end - TAIL_OVERLAP.get(interval, pd.Timedelta(0))
+                    fetched.append(self.fetch(ticker, tail_start, end, interval))
+
+            # yfinance returns an empty frame when a download fails: only the
+            # span of the bars actually received is recorded as covered
+            fetched = [part for part in fetched if not part.empty]
+            if cached is None and not fetched:
+                raise ValueError(f"No {interval} bars downloaded for {ticker} and none cached in {self.cache_dir}")
+            if fetched:
+                first = min(part.index[0] for part in fetched)
+                last = max(part.index[-1] for part in fetched) + bar_length(interval)
+                new_start = first if new_start is None else min(new_start, first)
+                new_end = last if new_end is None else max(new_end, last)
+
+                merged = pd.concat(([] if cached is None else [cached]) + fetched)
+                # Downloaded bars replace the cached ones at the same time
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                self.write(ticker, interval, merged, new_start, new_end)
+                cached = merged
+
+        return cached[(cached.index >= start) & (cached.index < end)]
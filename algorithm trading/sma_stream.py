@@ -0,0 +1,163 @@
+"""
+Streaming version of the SMA crossover signals of main.py.
+Bars are fed one at a time, each symbol keeps a ring buffer of its last ma_2
+closes with running sums for both windows, so every bar costs the same small
+amount of work whatever the history length, and any number of symbols can be
+followed in one process.
+
+Signals match main.py: the trigger starts at 0, the averages are compared
+from bar ma_2 on (main.py drops the first ma_2 bars), and a buy/sell event
+is emitted each time the sign of SMA_fast - SMA_slow differs from the trigger.
+
+Usage:
+    python sma_stream.py --csv bars.csv                 long CSV with Date, Ticker and Close columns
+    python sma_stream.py --tickers META AAPL            replay the local price cache
+"""
+from collections import namedtuple
+import argparse
+import csv
+import heapq
+import time
+
+Event = namedtuple('Event', ['time', 'symbol', 'signal', 'close', 'sma_fast', 'sma_slow'])
+
+class SymbolState:
+    """
+    Ring buffer and running sums of one symbol.
+    """
+    __slots__ = ('buffer', 'position', 'count', 'fast_sum', 'slow_sum', 'trigger')
+
+    def __init__(self, size):
+        self.buffer = [0.0] * size
+        self.position = 0
+        self.count = 0
+        self.fast_sum = 0.0
+        self.slow_sum = 0.0
+        self.trigger = 0
+
+class CrossoverStream:
+    """
+    Incremental SMA crossover signals for many symbols.
+
+    Args:
+        ma_1 (int): Fast window
+        ma_2 (int): Slow window, larger than ma_1
+    """
+
+    def __init__(self, ma_1=30, ma_2=100):
+        if not 0 < ma_1 < ma_2:
+            raise ValueError(f"Expected 0 < ma_1 < ma_2, got {ma_1} and {ma_2}")
+        self.ma_1 = ma_1
+        self.ma_2 = ma_2
+        self.symbols = {}
+
+    def update(self, symbol, bar_time, close):
+        """
+        Add the next bar of a symbol
+
+        Args:
+            symbol (str): Ticker symbol
+            bar_time: Bar time, passed through to the event
+            close (float): Close price
+
+        Returns:
+            Event: buy or sell event, None if the bar has no signal
+        """
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = SymbolState(self.ma_2)
+
+        buffer, ma_1, ma_2 = state.buffer, self.ma_1, self.ma_2
+        position = state.position
+        state.fast_sum += close - buffer[position - ma_1]
+        state.slow_sum += close - buffer[position]
+        buffer[position] = close
+        position += 1
+        if position == ma_2:
+            # Recompute the running sums once per wrap so float errors do not build up
+            position = 0
+            state.fast_sum = sum(buffer[-ma_1:])
+            state.slow_sum = sum(buffer)
+        state.position = position
+        state.count += 1
+
+        if state.count <= ma_2:
+            return None
+
+        sma_fast = state.fast_sum / ma_1
+        sma_slow = state.slow_sum / ma_2
+        if sma_fast > sma_slow and state.trigger != 1:
+            state.trigger = 1
+            return Event(bar_time, symbol, 'buy', close, sma_fast, sma_slow)
+        if sma_fast < sma_slow and state.trigger != -1:
+            state.trigger = -1
+            return Event(bar_time, symbol, 'sell', close, sma_fast, sma_slow)
+        return None
+
+    def run(self, bars):
+        """
+        Feed bars and yield the events
+
+        Args:
+            bars (iterable): (time, symbol, close) tuples in time order
+        """
+        update = self.update
+        for bar_time, symbol, close in bars:
+            event = update(symbol, bar_time, close)
+            if event is not None:
+                yield event
+
+def replay_csv(path, time_column='Date', symbol_column='Ticker', close_column='Close'):
+    """
+    Bars of a long CSV file with one row per symbol and time, in file order
+
+    Yields:
+        tuple: (time, symbol, close)
+    """
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row[close_column]:
+                yield row[time_column], row[symbol_column], float(row[close_column])
+
+def replay_cache(tickers, interval='1d', cache=None):
+    """
+    Bars of the local price cache of several tickers, merged in time order
+
+    Yields:
+        tuple: (time, symbol, close)
+    """
+    from price_cache import PriceCache
+
+    cache = cache or PriceCache(offline=True)
+
+    def bars(ticker):
+        close = cache.read(ticker, interval)['Close'].dropna()
+        return zip(close.index, [ticker] * len(close), close.to_numpy().tolist())
+
+    return heapq.merge(*[bars(ticker) for ticker in tickers], key=lambda bar: bar[0])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming SMA crossover signals")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help="long CSV with one row per symbol and time")
+    source.add_argument('--tickers', nargs='+', help="tickers to replay from the price cache")
+    parser.add_argument('--ma-1', type=int, default=30)
+    parser.add_argument('--ma-2', type=int, default=100)
+    parser.add_argument('--quiet', action='store_true', help="only print the summary")
+    args = parser.parse_args()
+
+    bars = replay_csv(args.csv) if args.csv else replay_cache(args.tickers)
+    stream = CrossoverStream(args.ma_1, args.ma_2)
+
+    start = time.perf_counter()
+    events = 0
+    for event in stream.run(bars):
+        events += 1
+        if not args.quiet:
+            print(f"{event.time} {event.symbol} {event.signal} at {event.close:.2f} "
+                  f"(SMA_{args.ma_1} {event.sma_fast:.2f}, SMA_{args.ma_2} {event.sma_slow:.2f})")
+    elapsed = time.perf_counter() - start
+
+    bar_count = sum(state.count for state in stream.symbols.values())
+    print(f"{bar_count} bars of {len(stream.symbols)} symbols, {events} events in {elapsed:.2f}s "
+          f"({bar_count / max(elapsed, 1e-9):.0f} bars/s)")
@@ -0,0 +1,181 @@
+"""
+Parameter sweep of the SMA crossover strategy of main.py over a grid of
+(ma_1, ma_2) window pairs and many tickers.
+Every moving average of a ticker comes from one cumulative sum of its close
+prices, the pairs of one fast window are evaluated together as a 2D array and
+the tickers are spread over a process pool.
+
+The strategy is long-only as in main.py: in the market from a buy signal to
+the next sell signal, entering on the close of the signal bar, and every pair
+is backtested with fees and slippage (backtest.py) over the same bars,
+starting once the longest window has a value.
+
+Usage:
+    python sma_sweep.py META AAPL MSFT --fast 5 100 5 --slow 10 200 10
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import datetime as dt
+import os
+import numpy as np
+import pandas as pd
+from backtest import FEE_RATE, SLIPPAGE_RATE, TRADING_DAYS_PER_YEAR, backtest, carry_forward
+from price_cache import PriceCache
+
+RESULTS_PATH = 'sma_sweep_results.csv'
+
+def rolling_means(close, windows):
+    """
+    Simple moving averages of several windows from one cumulative sum
+
+    Args:
+        close (np.ndarray): Close prices
+        windows (list): Window lengths
+
+    Returns:
+        np.ndarray: (len(windows), len(close)) array, NaN until a window is full
+    """
+    # Centering on the first price keeps the cumulative sum small on long series
+    cumsum = np.concatenate(([0.0], np.cumsum(close - close[0])))
+    means = np.full((len(windows), len(close)), np.nan)
+    for row, window in enumerate(windows):
+        if window <= len(close):
+            means[row, window - 1:] = (cumsum[window:] - cumsum[:-window]) / window + close[0]
+    return means
+
+def crossover_positions(sma_fast, sma_slow):
+    """
+    Long-only positions of crossover pairs: the trigger of main.py's signals is 1
+
+    Args:
+        sma_fast (np.ndarray): Fast moving average, shape (n,)
+        sma_slow (np.ndarray): Slow moving averages, shape (pairs, n)
+
+    Returns:
+        np.ndarray: Boolean positions, shape (pairs, n)
+    """
+    with np.errstate(invalid='ignore'):
+        state = np.sign(sma_fast - sma_slow)
+    state[np.isnan(state)] = 0
+    return carry_forward(state) > 0
+
+def sweep_ticker(ticker, close, fast_windows, slow_windows, fee_rate=FEE_RATE, slippage_rate=SLIPPAGE_RATE,
+                 periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Evaluate every (fast, slow) pair with fast < slow on one ticker
+
+    Args:
+        ticker (str): Ticker symbol
+        close (np.ndarray): Close prices
+        fast_windows (list): ma_1 candidates
+        slow_windows (list): ma_2 candidates
+        fee_rate (float): Fee per traded value
+        slippage_rate (float): Slippage per traded value
+        periods_per_year (int): Bars per year, to annualize the metrics
+
+    Returns:
+        pd.DataFrame: Backtest metrics of every pair, empty if the series is shorter than the longest window
+    """
+    close = np.asarray(close, dtype=float)
+    close = close[~np.isnan(close)]
+    start = max(max(fast_windows), max(slow_windows)) - 1
+    if len(close) - start < 2:
+        return pd.DataFrame()
+
+    windows = sorted(set(fast_windows) | set(slow_windows))
+    means = rolling_means(close, windows)[:, start:]
+    row_of = {window: row for row, window in enumerate(windows)}
+
+    results = []
+    for fast in fast_windows:
+        slows = [slow for slow in slow_windows if slow > fast]
+        if not slows:
+            continue
+        positions = crossover_positions(means[row_of[fast]], means[[row_of[slow] for slow in slows]])
+        metrics = backtest(close[start:], positions, fee_rate, slippage_rate, periods_per_year)['metrics']
+        metrics.insert(0, 'ticker', ticker)
+        metrics.insert(1, 'ma_1', fast)
+        metrics.insert(2, 'ma_2', slows)
+        results.append(metrics)
+
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+def _sweep_ticker(task):
+    return sweep_ticker(*task)
+
+def run_sweep(closes, fast_windows, slow_windows, max_workers=None, fee_rate=FEE_RATE, slippage_rate=SLIPPAGE_RATE,
+              periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Sweep the window grid over every ticker with a process pool
+
+    Args:
+        closes (dict): ticker -> close prices
+        fast_windows (list): ma_1 candidates
+        slow_windows (list): ma_2 candidates
+        max_workers (int): worker processes, the number of cores if None
+        fee_rate (float): Fee per traded value
+        slippage_rate (float): Slippage per traded value
+
+    Returns:
+        pd.DataFrame: Results ranked by Sharpe ratio then total return
+    """
+    tasks = [(ticker, np.asarray(close, dtype=float), fast_windows, slow_windows, fee_rate, slippage_rate, periods_per_year)
+             for ticker, close in closes.items()]
+    if max_workers == 1:
+        frames = [_sweep_ticker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(_sweep_ticker, tasks))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=['ticker', 'ma_1', 'ma_2'])
+
+    results = pd.concat(frames, ignore_index=True)
+    results = results.sort_values(['sharpe', 'total_return'], ascending=False, na_position='last', ignore_index=True)
+    results.insert(0, 'rank', np.arange(1, len(results) + 1))
+    return results
+
+def download_closes(tickers, start, end, offline=False):
+    """
+    Close prices of several tickers, served from the local price cache
+
+    Returns:
+        dict: ticker -> close prices as a numpy array
+    """
+    cache = PriceCache(offline=offline)
+    closes = {}
+    for ticker in tickers:
+        try:
+            closes[ticker] = cache.download(ticker, start, end)['Close'].dropna().to_numpy()
+        except Exception as e:
+            print(f"Error loading prices of {ticker}: {str(e)}")
+    return closes
+
+def window_range(values):
+    start, stop, step = values
+    return list(range(start, stop + 1, step))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SMA crossover parameter sweep")
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--fast', type=int, nargs=3, default=[5, 100, 5], metavar=('START', 'STOP', 'STEP'))
+    parser.add_argument('--slow', type=int, nargs=3, default=[10, 200, 10], metavar=('START', 'STOP', 'STEP'))
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--fee', type=float, default=FEE_RATE)
+    parser.add_argument('--slippage', type=float, default=SLIPPAGE_RATE)
+    parser.add_argument('--offline', action='store_true', help="use the price cache only")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    end = dt.datetime.now()
+    start = end - dt.timedelta(days=365 * args.years)
+    closes = download_closes(args.tickers, start, end, args.offline)
+
+    results = run_sweep(closes, window_range(args.fast), window_range(args.slow), args.workers,
+                        args.fee, args.slippage)
+    results.to_csv(args.output, index=False)
+    print(results.head(args.top).to_string(index=False))
+    print(f"Saved {len(results)} results to {args.output}")
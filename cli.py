@@ -0,0 +1,120 @@
+"""
+Single entry point for the projects of this repository.
+Only the standard library is imported up front: a subcommand loads its
+script, and the heavy packages it needs (pandas, gspread, matplotlib,
+pygame...), only when it runs, so `--help` and short-lived tasks start fast.
+
+Usage:
+    python cli.py <command> [arguments of the script...]
+    python cli.py --profile-startup gsheet-sync      print import timings to stderr
+
+Run `python cli.py --help` for the list of commands.
+"""
+import time
+
+CLI_START = time.perf_counter()
+
+import argparse
+import builtins
+import os
+import runpy
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Command -> (script path relative to the repository, help)
+COMMANDS = {
+    'gsheet-sync': ('get data from gsheet/get_data_gsheet_v2_used_in_prod.py', "export the POS photo sheets"),
+    'drive-photos': ('get data from gsheet/drive_photos.py', "download the Drive photos of the POS"),
+    'sma': ('algorithm trading/main.py', "SMA crossover signals and backtest"),
+    'sma-sweep': ('algorithm trading/sma_sweep.py', "(ma_1, ma_2) parameter sweep"),
+    'sma-stream': ('algorithm trading/sma_stream.py', "streaming crossover signals"),
+    'sma-charts': ('algorithm trading/charts.py', "batch chart rendering"),
+    'slots': ('python project for random number/main.py', "slot machine game"),
+    'slots-rtp': ('python project for random number/slot_simulator.py', "Monte Carlo RTP of the slot machine"),
+    'slots-exact': ('python project for random number/slot_exact.py', "exact RTP and payout distribution"),
+    'invest': ('investment app/main.py', "investment app"),
+    'visa': ('visa simple app/main.py', "visa booking app"),
+    'snake': ('snake game/main.py', "snake game"),
+    'ig-download': ('instagram_post_download/main.py', "download an Instagram profile")
+}
+
+class ImportProfiler:
+    """
+    Times the first import of every top-level module while it is active.
+    Nested imports are counted in the module that triggered them.
+    """
+
+    def __init__(self):
+        self.timings = []
+        self._depth = 0
+        self._import = builtins.__import__
+
+    def __enter__(self):
+        builtins.__import__ = self.timed_import
+        return self
+
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self._import
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.timings.append((name, time.perf_counter() - start))
+
+def run_script(script, argv):
+    """
+    Run a script as __main__ with its directory on sys.path, as `python <script>` would
+
+    Args:
+        script (str): Script path relative to the repository
+        argv (list): Arguments of the script
+    """
+    path = os.path.join(ROOT_DIR, script)
+    sys.path.insert(0, os.path.dirname(path))
+    sys.argv = [path] + list(argv)
+    runpy.run_path(path, run_name='__main__')
+
+def print_profile(command, startup_seconds, run_seconds, profiler, top=15):
+    """
+    Print the launcher startup, the run time and the slowest imports to stderr
+    """
+    imports_seconds = sum(seconds for _, seconds in profiler.timings)
+    print(f"\n[profile-startup] {command}: launcher {startup_seconds * 1000:.1f} ms, "
+          f"run {run_seconds * 1000:.1f} ms of which imports {imports_seconds * 1000:.1f} ms", file=sys.stderr)
+    for name, seconds in sorted(profiler.timings, key=lambda timing: -timing[1])[:top]:
+        print(f"[profile-startup]   {seconds * 1000:>9.1f} ms  {name}", file=sys.stderr)
+
+def main(argv=None):
+    epilog = "commands:\n" + "\n".join(
+        f"  {command:<14}{help_text}" for command, (_, help_text) in COMMANDS.items())
+    parser = argparse.ArgumentParser(prog='cli.py', description="Launcher of the fun-project scripts",
+                                     epilog=epilog, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile-startup', action='store_true', help="print import timings to stderr")
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command')
+    # Everything after the command is passed to its script, including --help
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    script = COMMANDS[args.command][0]
+    if not args.profile_startup:
+        run_script(script, args.args)
+        return
+
+    startup_seconds = time.perf_counter() - CLI_START
+    start = time.perf_counter()
+    with ImportProfiler() as profiler:
+        try:
+            run_script(script, args.args)
+        finally:
+            print_profile(args.command, startup_seconds, time.perf_counter() - start, profiler)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Offline benchmark of the gsheet transforms and jobs.
+The bundled dataset/*.csv files are turned back into worksheet rows with the
+source headers of their sheet spec and served by a fake worksheet, optionally
+repeated 10x / 100x, so no network or credentials are needed.
+
+Column-level transform functions are also timed against Series.apply of the
+per-row function they replace.
+
+Usage:
+    python benchmark_transforms.py                     compare with benchmark_baseline.json
+    python benchmark_transforms.py --save-baseline     record a new baseline
+    python benchmark_transforms.py --scales 1 10 100 --repeat 5
+"""
+from contextlib import redirect_stdout
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import pandas as pd
+import get_data_gsheet_v2_used_in_prod as etl
+from sheet_pipeline import load_sheet_spec, transform_sheet
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset')
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Bundled dataset -> sheet spec it is an output of
+DATASETS = {
+    'pos_code_master_photo_data_1__.csv': 'pos_code_master_photo_data_1',
+    'pos_code_master_photo_data_2.csv': 'pos_code_master_photo_data_2',
+    'pos_code_master_photo_data_2_test.csv': 'pos_code_master_photo_data_2',
+    'pos_code_master_photo_data_3.csv': 'pos_code_master_photo_data_3',
+    'pos_code_master_photo_data_3_test.csv': 'pos_code_master_photo_data_3'
+}
+
+# Stage -> (column-level function, per-row function it replaces)
+FUNCTION_BENCHMARKS = {
+    'split_coordinates': (etl.split_coordinates_column, etl.clean_and_split_coordinates),
+    'filter_valid_pos_code': (etl.is_valid_pos_code_column, etl.is_valid_pos_code),
+    'format_timestamp': (etl.format_timestamp_column, etl.format_timestamp)
+}
+
+class FakeWorksheet:
+    """
+    In-memory stand-in for a gspread worksheet.
+    """
+
+    def __init__(self, gid, values, title=None):
+        self.id = int(gid)
+        self.title = title or f"Sheet {gid}"
+        self.values = values
+
+    @property
+    def row_count(self):
+        return len(self.values)
+
+    def get_all_values(self):
+        return self.values
+
+    def get(self, row_range):
+        start_row, end_row = [int(row) for row in row_range.split(':')]
+        return self.values[start_row - 1:end_row]
+
+    def batch_get(self, ranges):
+        return [self.get(row_range) for row_range in ranges]
+
+class FakeSpreadsheet:
+    """
+    In-memory stand-in for a gspread spreadsheet, answering values_batch_get
+    from the FakeWorksheet objects by title.
+    """
+
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+
+    def values_batch_get(self, ranges):
+        by_range = {etl.absolute_range_name(worksheet.title): worksheet for worksheet in self.worksheets}
+        value_ranges = []
+        for sheet_range in ranges:
+            value_range = {'range': sheet_range}
+            # Like the API, empty worksheets have no values key
+            if by_range[sheet_range].values:
+                value_range['values'] = by_range[sheet_range].values
+            value_ranges.append(value_range)
+        return {'valueRanges': value_ranges}
+
+class FakeSession:
+    """
+    SheetsSession stand-in serving FakeWorksheet objects by gid.
+    """
+
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+
+    def spreadsheet(self, spreadsheet_id):
+        return FakeSpreadsheet(list(self.worksheets.values()))
+
+    def worksheet(self, spreadsheet_id, worksheet_gid):
+        return self.worksheets[str(worksheet_gid)]
+
+def source_names(spec):
+    """
+    Map output column names of a spec back to its source column names
+
+    Args:
+        spec (dict): Sheet spec
+
+    Returns:
+        dict: output column -> source column
+    """
+    to_source = {}
+    for step in spec['stages']:
+        if step['stage'] == 'rename':
+            to_source.update({output: source for source, output in step['columns'].items()})
+        elif step['stage'] == 'split_coordinates':
+            # The bundled sheet 1 output still has the unsplit coordinates
+            to_source['titik_koordinat'] = step['column']
+    return to_source
+
+def source_rows(spec, df):
+    """
+    Rebuild the worksheet rows a job output was made from
+
+    Args:
+        spec (dict): Sheet spec of the output
+        df (pd.DataFrame): Job output read as strings
+
+    Returns:
+        list: Header row with the source column names, then the data rows
+    """
+    df = df.copy()
+    for step in spec['stages']:
+        if step['stage'] == 'format_timestamp':
+            # YYYY-MM-DD back to DD/MM/YYYY
+            df[step['column']] = df[step['column']].str.split('-').str[::-1].str.join('/')
+
+    to_source = source_names(spec)
+    header = [to_source.get(col, col) for col in df.columns]
+    # Kept source columns missing from the dataset are added blank
+    header += [prefix for prefix in spec['columns'] if not any(h.startswith(prefix) for h in header)]
+    width = len(header)
+    return [header] + [row + [''] * (width - len(row)) for row in df.values.tolist()]
+
+def scale_rows(all_values, scale, pos_column):
+    """
+    Repeat the data rows of a worksheet, later copies get a -<n> POS code suffix
+
+    Args:
+        all_values (list): Worksheet rows, the first one being the header
+        scale (int): Number of copies of the data rows
+        pos_column (str): Source name of the POS code column
+
+    Returns:
+        list: Header row and scale times the data rows
+    """
+    if scale == 1:
+        return all_values
+    header, rows = all_values[0], all_values[1:]
+    pos_column = header.index(pos_column)
+    scaled = [header] + rows
+    for copy in range(1, scale):
+        for row in rows:
+            row = list(row)
+            if row[pos_column]:
+                row[pos_column] = f"{row[pos_column]}-{copy}"
+            scaled.append(row)
+    return scaled
+
+def best_time(func, repeat):
+    """
+    Run func repeat times with its prints silenced
+
+    Returns:
+        float: Fastest wall time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+def benchmark_functions(spec, all_values, repeat):
+    """
+    Time the column-level function of each stage of a spec against
+    Series.apply of the per-row function, on the raw worksheet column
+
+    Returns:
+        dict: function name -> seconds
+    """
+    header, rows = all_values[0], all_values[1:]
+    to_source = source_names(spec)
+    results = {}
+    for step in spec['stages']:
+        if step['stage'] not in FUNCTION_BENCHMARKS:
+            continue
+        column_func, row_func = FUNCTION_BENCHMARKS[step['stage']]
+        if step['stage'] == 'split_coordinates':
+            source = next(name for name in header if name.startswith(step['column']))
+        else:
+            source = to_source.get(step['column'], step['column'])
+        position = header.index(source)
+        values = pd.Series([row[position] for row in rows])
+
+        results[column_func.__name__] = best_time(lambda: column_func(values), repeat)
+        results[f"apply({row_func.__name__})"] = best_time(lambda: values.apply(row_func), repeat)
+    return results
+
+def benchmark_dataset(dataset, scale, repeat, work_dir):
+    """
+    Time the transform and the job paths of one dataset at one scale
+
+    Returns:
+        dict: benchmark name -> seconds
+    """
+    spec = load_sheet_spec(DATASETS[dataset])
+    spec['incremental'] = False
+    spec['dedup'] = False
+    gid = spec['gids'][0]
+    spec['gids'] = [gid]
+
+    df = pd.read_csv(os.path.join(DATASET_DIR, dataset), sep=";", dtype=str, keep_default_na=False)
+    pos_column = next(step['column'] for step in spec['stages'] if step['stage'] == 'filter_valid_pos_code')
+    all_values = scale_rows(source_rows(spec, df), scale, source_names(spec)[pos_column])
+    session = FakeSession({gid: FakeWorksheet(gid, all_values)})
+
+    def clean():
+        for file_name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, file_name))
+
+    def run_job(chunk_size=None, fresh=True):
+        if fresh:
+            clean()
+        etl.run_sheet_job(spec, session, chunk_size=chunk_size)
+
+    results = {
+        'rows': len(all_values) - 1,
+        'transform': best_time(lambda: transform_sheet(spec, all_values), repeat),
+        'job': best_time(run_job, repeat),
+        'job_stream': best_time(lambda: run_job(etl.STREAM_CHUNK_ROWS), repeat)
+    }
+    # Snapshot cache hit: the output of the previous run is kept
+    with redirect_stdout(io.StringIO()):
+        run_job()
+    results['job_unchanged'] = best_time(lambda: run_job(fresh=False), repeat)
+    results.update(benchmark_functions(spec, all_values, repeat))
+    return results
+
+def run_benchmarks(datasets, scales, repeat):
+    """
+    Benchmark every dataset at every scale with the job outputs in a temp dir
+
+    Returns:
+        dict: "<dataset> x<scale>" -> benchmark results
+    """
+    work_dir = tempfile.mkdtemp(prefix='gsheet_benchmark_')
+    config = (etl.OUTPUT_DIR, etl.OUTPUT_FORMAT, etl.SYNC_STATE_FILE, etl.SNAPSHOT_MANIFEST_FILE)
+    etl.OUTPUT_DIR = work_dir
+    etl.OUTPUT_FORMAT = 'csv'
+    etl.SYNC_STATE_FILE = os.path.join(work_dir, 'sync_state.json')
+    etl.SNAPSHOT_MANIFEST_FILE = os.path.join(work_dir, 'snapshot_manifest.json')
+    try:
+        results = {}
+        for scale in scales:
+            for dataset in datasets:
+                key = f"{dataset} x{scale}"
+                results[key] = benchmark_dataset(dataset, scale, repeat, work_dir)
+                print(f"Benchmarked {key}: {results[key]['rows']} rows")
+        return results
+    finally:
+        etl.OUTPUT_DIR, etl.OUTPUT_FORMAT, etl.SYNC_STATE_FILE, etl.SNAPSHOT_MANIFEST_FILE = config
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def print_report(results, baseline=None):
+    """
+    Print the timings in ms, with the ratio to the baseline when there is one
+    """
+    for key, timings in results.items():
+        print(f"\n{key} ({timings['rows']} rows)")
+        for name, seconds in timings.items():
+            if name == 'rows':
+                continue
+            line = f"  {name:<38}{seconds * 1000:>10.1f} ms"
+            base = (baseline or {}).get(key, {}).get(name)
+            if base:
+                line += f"  {seconds / base:>6.2f}x baseline"
+            print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the gsheet transforms and jobs")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--datasets', nargs='+', default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.datasets, args.scales, args.repeat)
+
+    if args.save_baseline:
+        baseline = {
+            'machine': {'python': platform.python_version(), 'pandas': pd.__version__, 'platform': platform.platform()},
+            'results': results
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print_report(results)
+        print(f"\nSaved baseline to {args.baseline}")
+    else:
+        baseline = None
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        print_report(results, baseline)
@@ -0,0 +1,137 @@
+"""
+Columnar (Parquet / Arrow IPC) output for the pos_code_master_photo_data datasets.
+Repeated text columns are dictionary encoded, coordinates are stored as float64
+and timestamps as date32, so downstream loaders do not have to re-parse strings.
+"""
+from datetime import date
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Low-cardinality columns stored with dictionary encoding
+CATEGORICAL_COLUMNS = ['kota_kabupaten', 'jenis_bangunan', 'status_upload', 'keterangan']
+FLOAT_COLUMNS = ['latitude', 'longitude']
+DATE_COLUMNS = ['timestamp']
+
+COLUMNAR_EXTENSIONS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow'
+}
+
+def parse_date(value):
+    """
+    Parse a YYYY-MM-DD string written by format_timestamp into a date
+
+    Args:
+        value (str): Formatted timestamp
+
+    Returns:
+        date: Parsed date, None if the value is not a valid date
+    """
+    # Sentinel used by format_timestamp for missing timestamps
+    if value == '31-12-9999':
+        return date(9999, 12, 31)
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_date_column(values):
+    """
+    Parse a column of formatted timestamps, each distinct value only once
+
+    Args:
+        values (pd.Series): Column of YYYY-MM-DD strings
+
+    Returns:
+        pd.Series: date objects, None where the value is not a valid date
+    """
+    codes, uniques = pd.factorize(values)
+    # Null values have code -1, which picks the trailing None
+    parsed = np.array([parse_date(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(parsed[codes], index=values.index, dtype=object)
+
+def to_columnar_frame(df):
+    """
+    Convert an output DataFrame to compact dtypes
+
+    Args:
+        df (pd.DataFrame): Output of transform_sheet
+
+    Returns:
+        pd.DataFrame: Copy with categorical, float64 and date columns
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif col in FLOAT_COLUMNS:
+            df[col] = df[col].astype(float)
+        elif col in DATE_COLUMNS:
+            df[col] = parse_date_column(df[col])
+    return df
+
+def columnar_output_path(output_path, output_format):
+    """
+    Swap the .csv extension of an output path for the columnar one
+
+    Args:
+        output_path (str): CSV output path
+        output_format (str): 'parquet' or 'arrow'
+
+    Returns:
+        str: Output path with the matching extension
+    """
+    return os.path.splitext(output_path)[0] + COLUMNAR_EXTENSIONS[output_format]
+
+def write_columnar(df, output_path, output_format='parquet', partition_by=None):
+    """
+    Write an output DataFrame as Parquet or Arrow IPC
+
+    Args:
+        df (pd.DataFrame): Output of transform_sheet
+        output_path (str): file to write, or base directory when partitioning
+        output_format (str): 'parquet' or 'arrow'
+        partition_by (str): column to partition the dataset by, e.g. 'kota_kabupaten'
+    """
+    if output_format not in COLUMNAR_EXTENSIONS:
+        raise ValueError(f"Unknown columnar output format: {output_format}")
+
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required for parquet/arrow output, use the csv output instead")
+
+    df_columnar = to_columnar_frame(df)
+    schema = pa.Schema.from_pandas(df_columnar, preserve_index=False)
+    for col in DATE_COLUMNS:
+        if col in df_columnar.columns:
+            schema = schema.set(schema.get_field_index(col), pa.field(col, pa.date32()))
+    table = pa.Table.from_pandas(df_columnar, schema=schema, preserve_index=False)
+
+    if partition_by is not None:
+        # Written to a temporary directory that then replaces the dataset, so
+        # the partitions of values that are gone are removed with it
+        tmp_path = f"{output_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        ds.write_dataset(
+            table,
+            tmp_path,
+            format='ipc' if output_format == 'arrow' else 'parquet',
+            partitioning=[partition_by],
+            partitioning_flavor='hive'
+        )
+        old_path = f"{output_path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(output_path):
+            os.replace(output_path, old_path)
+        os.replace(tmp_path, output_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    elif output_format == 'parquet':
+        pq.write_table(table, output_path)
+    else:
+        feather.write_feather(table, output_path)
@@ -0,0 +1,222 @@
+"""
+Manifest and downloader for the Google Drive photos linked in the foto_* columns.
+Drive file ids are extracted from the sheet 1 and sheet 2 outputs and
+deduplicated, then downloaded by a bounded thread pool into a
+content-addressed cache, so a photo is fetched once no matter how many POS
+rows link to it and ids already in the cache are skipped on later runs.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import threading
+import urllib.request
+import pandas as pd
+from json_state import load_json_state, save_json_state
+from sheet_pipeline import load_sheet_spec
+from sheets_quota import RequestScheduler
+
+# Sheet specs of the sheet 1 and sheet 2 outputs, the manifest is written
+# next to them in OUTPUT_DIR and the photo cache is a sibling of OUTPUT_DIR
+SHEET_SPEC_NAMES = ['pos_code_master_photo_data_1', 'pos_code_master_photo_data_2']
+MANIFEST_OUTPUT = 'drive_photo_manifest'
+PHOTO_CACHE_NAME = 'photo_cache'
+
+PHOTO_COLUMNS = ['foto_lokasi_bagian_depan', 'foto_lokasi_bagian_dalam', 'foto_tambahan_lokasi_pos']
+
+# open?id=<id>, uc?id=<id> and /file/d/<id>/view links
+DRIVE_ID_PATTERN = r'drive\.google\.com/(?:open\?id=|uc\?(?:[^\s,]*&)?id=|file/d/)([-\w]{20,})'
+
+PHOTO_FETCH_MAX_WORKERS = 8
+# Drive API read quota per user
+DRIVE_REQUESTS_PER_MINUTE = 600
+
+def build_photo_manifest(frames):
+    """
+    Extract and deduplicate the Drive file ids linked in the photo columns
+
+    Args:
+        frames (list): Job outputs with a pos_code column and some of PHOTO_COLUMNS
+
+    Returns:
+        pd.DataFrame: drive_id, pos_code and column of the first link to each file,
+        and link_count, the number of times it is linked
+    """
+    links = []
+    for df in frames:
+        for col in [c for c in PHOTO_COLUMNS if c in df.columns]:
+            found = df[col].astype(str).str.findall(DRIVE_ID_PATTERN).explode().dropna()
+            links.append(pd.DataFrame({
+                'drive_id': found.to_numpy(),
+                'pos_code': df.loc[found.index, 'pos_code'].to_numpy(),
+                'column': col
+            }))
+
+    if not links:
+        return pd.DataFrame(columns=['drive_id', 'pos_code', 'column', 'link_count'])
+
+    links = pd.concat(links, ignore_index=True)
+    link_count = links.groupby('drive_id', sort=False).size()
+    manifest = links.drop_duplicates('drive_id').reset_index(drop=True)
+    manifest['link_count'] = manifest['drive_id'].map(link_count).to_numpy()
+    return manifest
+
+class PhotoCache:
+    """
+    Content-addressed file cache: files are stored under their sha256 and
+    index.json maps each Drive id to the hash of its content.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = load_json_state(self.index_path)
+        self._lock = threading.Lock()
+
+    def content_path(self, sha256):
+        return os.path.join(self.cache_dir, sha256[:2], sha256)
+
+    def path(self, drive_id):
+        """
+        Args:
+            drive_id (str): Drive file id
+
+        Returns:
+            str: Cached file of the id, None if it is not cached
+        """
+        entry = self.index.get(drive_id)
+        if entry is None:
+            return None
+        path = self.content_path(entry['sha256'])
+        return path if os.path.exists(path) else None
+
+    def has(self, drive_id):
+        return self.path(drive_id) is not None
+
+    def put(self, drive_id, content):
+        """
+        Store the content of a Drive file, identical files are stored once
+
+        Args:
+            drive_id (str): Drive file id
+            content (bytes): File content
+
+        Returns:
+            str: Cached file path
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.content_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self.index[drive_id] = {'sha256': sha256, 'size': len(content)}
+        return path
+
+    def save(self):
+        """
+        Write index.json
+        """
+        with self._lock:
+            save_json_state(self.index, self.index_path)
+
+class HttpTransport:
+    """
+    Downloads files from url_template, e.g. a local HTTP stand-in for Drive:
+    HttpTransport('http://127.0.0.1:8000/{drive_id}')
+    """
+
+    def __init__(self, url_template, timeout=60):
+        self.url_template = url_template
+        self.timeout = timeout
+
+    def __call__(self, drive_id):
+        with urllib.request.urlopen(self.url_template.format(drive_id=drive_id), timeout=self.timeout) as response:
+            return response.read()
+
+class DriveApiTransport:
+    """
+    Downloads files with the Drive API using the service account credentials.
+    """
+
+    URL_TEMPLATE = 'https://www.googleapis.com/drive/v3/files/{drive_id}?alt=media&supportsAllDrives=true'
+    SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+
+    def __init__(self, json_auth_file, timeout=60):
+        from google.auth.transport.requests import AuthorizedSession
+        from google.oauth2.service_account import Credentials
+
+        self.credentials = Credentials.from_service_account_file(
+            filename=json_auth_file, scopes=self.SCOPES)
+        self.session_class = AuthorizedSession
+        self.timeout = timeout
+        # requests sessions are not shared between threads
+        self._local = threading.local()
+
+    def __call__(self, drive_id):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self.session_class(self.credentials)
+        response = self._local.session.get(self.URL_TEMPLATE.format(drive_id=drive_id), timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+def fetch_photos(drive_ids, cache, transport, max_workers=PHOTO_FETCH_MAX_WORKERS, scheduler=None):
+    """
+    Download the Drive files that are not cached yet with a bounded thread pool
+
+    Args:
+        drive_ids (list): Drive file ids, e.g. the drive_id column of the manifest
+        cache (PhotoCache): cache to read and fill
+        transport (callable): drive_id -> file content as bytes
+        max_workers (int): maximum number of downloads at the same time
+        scheduler (RequestScheduler): rate limit and retries, a Drive quota one is created if omitted
+
+    Returns:
+        dict: number of downloaded and cached ids, and drive_id -> error for the failed ones
+    """
+    if scheduler is None:
+        scheduler = RequestScheduler(DRIVE_REQUESTS_PER_MINUTE)
+
+    drive_ids = list(dict.fromkeys(drive_ids))
+    missing = [drive_id for drive_id in drive_ids if not cache.has(drive_id)]
+
+    def fetch(drive_id):
+        try:
+            cache.put(drive_id, scheduler.call(transport, drive_id))
+            return None
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            errors = dict(zip(missing, executor.map(fetch, missing)))
+    finally:
+        cache.save()
+
+    failed = {drive_id: error for drive_id, error in errors.items() if error is not None}
+    return {
+        'downloaded': len(missing) - len(failed),
+        'cached': len(drive_ids) - len(missing),
+        'failed': failed
+    }
+
+if __name__ == "__main__":
+    # Imported here so the manifest and cache can be used without gspread
+    from get_data_gsheet_v2_used_in_prod import JSON_AUTH_FILE, OUTPUT_DIR, OUTPUT_SUFFIX, sheet_output_path
+
+    input_paths = [sheet_output_path(load_sheet_spec(name)) for name in SHEET_SPEC_NAMES]
+    manifest_path = os.path.join(OUTPUT_DIR, f"{MANIFEST_OUTPUT}{OUTPUT_SUFFIX}.csv")
+    photo_cache_dir = os.path.join(os.path.dirname(OUTPUT_DIR), PHOTO_CACHE_NAME)
+
+    frames = [pd.read_csv(path, sep=";", dtype=str, keep_default_na=False) for path in input_paths]
+    manifest = build_photo_manifest(frames)
+    manifest.to_csv(manifest_path, sep=";", header=True, index=False)
+    print(f"Successfully saved {len(manifest)} Drive photos to {manifest_path}")
+
+    summary = fetch_photos(manifest['drive_id'], PhotoCache(photo_cache_dir), DriveApiTransport(JSON_AUTH_FILE))
+    print(f"Downloaded {summary['downloaded']} photos, {summary['cached']} already cached, {len(summary['failed'])} failed")
+    for drive_id, error in list(summary['failed'].items())[:10]:
+        print(f"Error downloading Drive file {drive_id}: {error}")
@@ -0,0 +1,101 @@
+"""
+Per-stage metrics for the gsheet jobs, written as JSON lines.
+Every stage (auth, fetch, frame build, transform stages, write) appends one
+line with its wall time, row counts, fetched bytes and the peak RSS of the
+process so far, so a slow or failing stage shows up in the metrics file
+without running a profiler.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import sys
+import threading
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+def peak_rss_mb():
+    """
+    Peak resident memory of the current process
+
+    Returns:
+        float: Peak RSS in MB, None if the platform does not report it
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+def values_bytes(values):
+    """
+    Size of the cell text of fetched worksheet rows
+
+    Args:
+        values (list): Rows of cell values
+
+    Returns:
+        int: Number of UTF-8 bytes in the cells
+    """
+    return sum(len(cell.encode('utf-8')) for row in values for cell in row)
+
+class MetricsRecorder:
+    """
+    Appends stage metrics of one run to a JSON lines file.
+    With metrics_file=None nothing is written, so the jobs can always record.
+    """
+
+    def __init__(self, metrics_file=None, run_id=None):
+        self.metrics_file = metrics_file
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        # Stages are recorded from the fetch threads too
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        """
+        Write one metrics line
+
+        Args:
+            record (dict): stage fields, run_id and the time are added
+        """
+        if self.metrics_file is None:
+            return
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'run_id': self.run_id, **record}
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.metrics_file, 'a') as f:
+                f.write(line + '\n')
+
+    @contextmanager
+    def stage(self, stage, **fields):
+        """
+        Time a stage and write its metrics line when it ends, also on errors.
+        The yielded dict can be filled with rows_in, rows_out, bytes_fetched, ...
+
+        Args:
+            stage (str): Stage name, e.g. 'fetch' or 'stage:split_coordinates'
+            **fields: Extra fields such as sheet and gid
+        """
+        record = {'stage': stage, **fields}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.setdefault('status', 'ok')
+            record['wall_s'] = round(time.perf_counter() - start, 6)
+            record['peak_rss_mb'] = peak_rss_mb()
+            self.emit(record)
+
+# Recorder used when a job is called without one
+NO_METRICS = MetricsRecorder()
@@ -1,10 +1,142 @@
 import gspread
+from gspread.utils import absolute_range_name, fill_gaps
 import json
 from google.oauth2.service_account import Credentials
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 import pandas as pd
 import numpy as np
 import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from etl_metrics import NO_METRICS, MetricsRecorder, values_bytes
+from sheets_quota import RequestScheduler, ScheduledProxy, is_retryable
+from columnar_output import columnar_output_path, write_columnar
+from json_state import load_json_state, save_json_state
+from pos_master import latest_upload_positions
+from snapshot_cache import hash_rows, is_unchanged, load_manifest, record_snapshot, save_manifest
+from sheet_pipeline import check_stages, load_sheet_spec, load_sheet_specs, register_stage, transform_sheet
+
+# JSON_AUTH_FILE = '/opt/airflow/modules/lp_pos_photo/google_auth.json'
+JSON_AUTH_FILE = '/Users/PARCEL/Downloads/testing_data_gsheet/google_auth.json'
+
+# Spreadsheet ids, gids, columns and stages of each sheet are in sheet_specs/*.json
+# OUTPUT_DIR = '/opt/airflow/modules/lp_pos_photo/dataset'
+# OUTPUT_SUFFIX = ''
+OUTPUT_DIR = '/Users/PARCEL/Downloads/testing_data_gsheet/dataset'
+OUTPUT_SUFFIX = '_test'
+
+# Maximum number of spreadsheets fetched at the same time
+FETCH_MAX_WORKERS = 4
+
+# Sheets API read quota per user, throttled and 5xx requests are retried with backoff
+SHEETS_READ_REQUESTS_PER_MINUTE = 60
+SHEETS_MAX_RETRIES = 5
+
+# Output file format: "csv" (semicolon separated), "parquet" or "arrow" (Arrow IPC)
+OUTPUT_FORMAT = "csv"
+# Column to partition columnar output by, e.g. 'kota_kabupaten' (sheet 1 only)
+OUTPUT_PARTITION_BY = None
+
+# Read worksheets in blocks of STREAM_CHUNK_ROWS rows instead of one get_all_values() call
+STREAM_WORKSHEETS = False
+STREAM_CHUNK_ROWS = 5000
+
+# Per-GID watermarks of the incremental sync. Appends never see edits to rows
+# already synced (e.g. a status_upload set to APPROVE later), so a sheet is
+# read in full again once its last full read is older than this
+INCREMENTAL_FULL_REFRESH_HOURS = 24
+# SYNC_STATE_FILE = '/opt/airflow/modules/lp_pos_photo/dataset/sync_state.json'
+SYNC_STATE_FILE = '/Users/PARCEL/Downloads/testing_data_gsheet/dataset/sync_state.json'
+
+# Content hash of each worksheet's last snapshot, unchanged worksheets are not rewritten
+# SNAPSHOT_MANIFEST_FILE = '/opt/airflow/modules/lp_pos_photo/dataset/snapshot_manifest.json'
+SNAPSHOT_MANIFEST_FILE = '/Users/PARCEL/Downloads/testing_data_gsheet/dataset/snapshot_manifest.json'
+
+# JSON lines with the wall time, rows, bytes and peak RSS of every stage, None to disable
+# METRICS_FILE = '/opt/airflow/modules/lp_pos_photo/dataset/etl_metrics.jsonl'
+METRICS_FILE = '/Users/PARCEL/Downloads/testing_data_gsheet/dataset/etl_metrics.jsonl'
+
+class SheetsSession:
+    """
+    Google Sheets client shared by every job in a run.
+    Authenticates once, reuses the authorized HTTP session and caches
+    spreadsheet handles and the GID to worksheet map of each spreadsheet.
+    The handles it returns send their requests through the RequestScheduler.
+    """
+
+    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+    def __init__(self, json_auth_file: str = JSON_AUTH_FILE, metrics=NO_METRICS, scheduler=None):
+        self.json_auth_file = json_auth_file
+        self.metrics = metrics
+        if scheduler is None:
+            scheduler = RequestScheduler(SHEETS_READ_REQUESTS_PER_MINUTE, SHEETS_MAX_RETRIES, metrics=metrics)
+        self.scheduler = scheduler
+        self._client = None
+        self._spreadsheets = {}
+        self._worksheets = {}
+        # Worksheets may be fetched from several threads: each spreadsheet is
+        # opened and listed under its own lock, so one slow spreadsheet does
+        # not block the others, and _lock only guards the lock table
+        self._lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+        self._spreadsheet_locks = {}
+
+    @property
+    def client(self):
+        with self._auth_lock:
+            if self._client is None:
+                with self.metrics.stage('auth'):
+                    credentials = Credentials.from_service_account_file(
+                        filename=self.json_auth_file, scopes=self.SCOPES)
+                    self._client = gspread.authorize(credentials=credentials)
+        return self._client
+
+    def spreadsheet_lock(self, spreadsheet_id: str):
+        """
+        Lock serializing the first open and worksheet listing of a spreadsheet
+        """
+        with self._lock:
+            return self._spreadsheet_locks.setdefault(spreadsheet_id, threading.RLock())
+
+    def spreadsheet(self, spreadsheet_id: str):
+        """
+        Open a spreadsheet by key, reusing the handle on later calls
+
+        Args:
+            spreadsheet_id (str): id of spreadsheet
+        """
+        with self.spreadsheet_lock(spreadsheet_id):
+            if spreadsheet_id not in self._spreadsheets:
+                client = self.client
+                with self.metrics.stage('open_spreadsheet', spreadsheet_id=spreadsheet_id):
+                    spreadsheet = self.scheduler.call(client.open_by_key, spreadsheet_id)
+                self._spreadsheets[spreadsheet_id] = ScheduledProxy(spreadsheet, self.scheduler)
+        return self._spreadsheets[spreadsheet_id]
+
+    def worksheet(self, spreadsheet_id: str, worksheet_gid: str):
+        """
+        Select worksheet by GID, listing the spreadsheet's worksheets only once
+
+        Args:
+            spreadsheet_id (str): id of spreadsheet
+            worksheet_gid (str): gid of worksheet
+        """
+        with self.spreadsheet_lock(spreadsheet_id):
+            if spreadsheet_id not in self._worksheets:
+                spreadsheet = self.spreadsheet(spreadsheet_id)
+                with self.metrics.stage('list_worksheets', spreadsheet_id=spreadsheet_id):
+                    worksheets = spreadsheet.worksheets()
+                self._worksheets[spreadsheet_id] = {
+                    str(sheet.id): ScheduledProxy(sheet, self.scheduler) for sheet in worksheets
+                }
+
+        worksheet = self._worksheets[spreadsheet_id].get(str(worksheet_gid))
+        if worksheet is None:
+            raise ValueError(f"No worksheet found with gid: {worksheet_gid}")
+
+        return worksheet
 
 def auth_to_google_v2(json_auth_file: str, spreadsheet_id: str, worksheet_gid: str):
     """
@@ -15,47 +147,380 @@ def auth_to_google_v2(json_auth_file: str, spreadsheet_id: str, worksheet_gid: s
         spreadsheet_id (str): id of spreadsheet
         worksheet_gid (str): gid of worksheet
     """
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-    credentials = Credentials.from_service_account_file(
-        filename=json_auth_file, scopes=SCOPES)
-    gc = gspread.authorize(credentials=credentials)
-    spreadsheet = gc.open_by_key(spreadsheet_id)
-    
-    # Get all worksheets and find the one with matching gid
-    worksheets = spreadsheet.worksheets()
-    worksheet = None
-    for sheet in worksheets:
-        if str(sheet.id) == worksheet_gid:
-            worksheet = sheet
-            break
-            
-    if worksheet is None:
-        raise ValueError(f"No worksheet found with gid: {worksheet_gid}")
-        
-    return worksheet
+    return SheetsSession(json_auth_file).worksheet(spreadsheet_id, worksheet_gid)
 
-def make_headers_unique(headers):
+def read_all_values(session, spreadsheet_id, worksheet_gid, metrics=NO_METRICS):
     """
-    Make header names unique by appending numbers to duplicates.
-    
+    Fetch all values of a worksheet and record the fetch
+
     Args:
-        headers (list): List of header names
-    
+        session (SheetsSession): shared Sheets client
+        spreadsheet_id (str): id of spreadsheet
+        worksheet_gid (str): gid of worksheet
+        metrics (MetricsRecorder): records the fetch time, rows and bytes
+
     Returns:
-        list: List of unique header names
+        list: All rows of the worksheet including the header row
     """
-    seen = {}
-    unique_headers = []
-    
-    for header in headers:
-        if header in seen:
-            seen[header] += 1
-            unique_headers.append(f"{header}_{seen[header]}")
-        else:
-            seen[header] = 0
-            unique_headers.append(header)
-    
-    return unique_headers
+    worksheet = session.worksheet(spreadsheet_id, worksheet_gid)
+    with metrics.stage('fetch', spreadsheet_id=spreadsheet_id, gid=worksheet_gid) as record:
+        values = worksheet.get_all_values()
+        record['rows_out'] = max(len(values) - 1, 0)
+        record['bytes_fetched'] = values_bytes(values)
+    return values
+
+def batch_read_all_values(session, spreadsheet_id, worksheet_gids, metrics=NO_METRICS):
+    """
+    Fetch all values of several worksheets of one spreadsheet with a single
+    values_batch_get request, padded the same way as get_all_values().
+    If the batch fails with an error that is not retried, each worksheet is
+    read on its own so one bad range does not fail the others.
+
+    Args:
+        session (SheetsSession): shared Sheets client
+        spreadsheet_id (str): id of spreadsheet
+        worksheet_gids (list): gids of the worksheets to fetch
+        metrics (MetricsRecorder): records the fetch time, rows and bytes
+
+    Returns:
+        dict: worksheet_gid -> rows, or the exception raised for that worksheet
+    """
+    values = {}
+    ranges = {}
+    for worksheet_gid in worksheet_gids:
+        try:
+            title = session.worksheet(spreadsheet_id, worksheet_gid).title
+            ranges[worksheet_gid] = absolute_range_name(title)
+        except Exception as e:
+            values[worksheet_gid] = e
+    if not ranges:
+        return values
+
+    try:
+        with metrics.stage('fetch', spreadsheet_id=spreadsheet_id, gids=list(ranges)) as record:
+            response = session.spreadsheet(spreadsheet_id).values_batch_get(list(ranges.values()))
+            for worksheet_gid, value_range in zip(ranges, response.get('valueRanges', [])):
+                # Empty worksheets have no values key, get_all_values() returns [[]] for them
+                rows = value_range.get('values')
+                values[worksheet_gid] = fill_gaps(rows) if rows else [[]]
+            record['rows_out'] = sum(max(len(values[gid]) - 1, 0) for gid in ranges)
+            record['bytes_fetched'] = sum(values_bytes(values[gid]) for gid in ranges)
+    except Exception as e:
+        if len(ranges) == 1 or is_retryable(e):
+            raise
+        # The error may come from one range only, e.g. a tab renamed since it was listed
+        print(f"Warning: batch read of spreadsheet {spreadsheet_id} failed ({str(e)}), reading its worksheets one by one")
+        for worksheet_gid in ranges:
+            try:
+                values[worksheet_gid] = read_all_values(session, spreadsheet_id, worksheet_gid, metrics)
+            except Exception as gid_error:
+                values[worksheet_gid] = gid_error
+    return values
+
+def fetch_worksheet_values(session, targets, max_workers=FETCH_MAX_WORKERS, metrics=NO_METRICS):
+    """
+    Fetch all values of several worksheets, one batch request per spreadsheet,
+    with the spreadsheets fetched concurrently.
+    A failing worksheet does not stop the others, its exception is returned
+    in place of the values and raised again by the job that processes it.
+
+    Args:
+        session (SheetsSession): shared Sheets client
+        targets (list): (spreadsheet_id, worksheet_gid) pairs to fetch
+        max_workers (int): maximum number of spreadsheets fetched at the same time
+        metrics (MetricsRecorder): records each fetch
+
+    Returns:
+        dict: (spreadsheet_id, worksheet_gid) -> rows, or the exception raised
+    """
+    gids_by_spreadsheet = {}
+    for spreadsheet_id, worksheet_gid in dict.fromkeys(targets):
+        gids_by_spreadsheet.setdefault(spreadsheet_id, []).append(worksheet_gid)
+    if not gids_by_spreadsheet:
+        return {}
+
+    def fetch(group):
+        spreadsheet_id, worksheet_gids = group
+        try:
+            return batch_read_all_values(session, spreadsheet_id, worksheet_gids, metrics)
+        except Exception as e:
+            return {worksheet_gid: e for worksheet_gid in worksheet_gids}
+
+    groups = list(gids_by_spreadsheet.items())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = executor.map(fetch, groups)
+        return {
+            (spreadsheet_id, worksheet_gid): values[worksheet_gid]
+            for (spreadsheet_id, _), values in zip(groups, fetched)
+            for worksheet_gid in values
+        }
+
+def get_worksheet_values(session, spreadsheet_id, worksheet_gid, prefetched=None, metrics=NO_METRICS):
+    """
+    Get all values of a worksheet, from fetch_worksheet_values output if present
+
+    Args:
+        session (SheetsSession): shared Sheets client
+        spreadsheet_id (str): id of spreadsheet
+        worksheet_gid (str): gid of worksheet
+        prefetched (dict): output of fetch_worksheet_values
+        metrics (MetricsRecorder): records the fetch if the worksheet was not prefetched
+
+    Returns:
+        list: All rows of the worksheet including the header row
+    """
+    if prefetched is not None and (spreadsheet_id, worksheet_gid) in prefetched:
+        values = prefetched[(spreadsheet_id, worksheet_gid)]
+        if isinstance(values, Exception):
+            raise values
+        return values
+
+    return read_all_values(session, spreadsheet_id, worksheet_gid, metrics)
+
+def load_sync_state(state_path=SYNC_STATE_FILE):
+    """
+    Load the per-GID watermarks of the incremental sync
+
+    Args:
+        state_path (str): path of the json state file
+
+    Returns:
+        dict: "<spreadsheet_id>:<gid>" -> watermark, empty if there is no state yet
+    """
+    return load_json_state(state_path)
+
+def save_sync_state(state, state_path=SYNC_STATE_FILE):
+    """
+    Write the per-GID watermarks
+
+    Args:
+        state (dict): watermarks as returned by load_sync_state
+        state_path (str): path of the json state file
+    """
+    save_json_state(state, state_path)
+
+def strip_trailing_blanks(row):
+    """
+    Drop the empty cells gspread pads to the right of a row
+
+    Args:
+        row (list): Row of cell values
+
+    Returns:
+        list: Row without trailing empty cells
+    """
+    row = list(row)
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+def row_fingerprint(row):
+    """
+    Content hash of one worksheet row, trailing empty cells ignored
+
+    Args:
+        row (list): Row of cell values
+
+    Returns:
+        str: hex digest
+    """
+    return hash_rows([strip_trailing_blanks(row)]).hexdigest()
+
+def record_sync_watermark(state, state_key, header, row_count, last_row=None):
+    """
+    Remember how many data rows were synced, the header they had, a
+    fingerprint of the last one and when the whole sheet was read
+
+    Args:
+        state (dict): watermarks as returned by load_sync_state
+        state_key (str): "<spreadsheet_id>:<gid>"
+        header (list): Header row of the worksheet
+        row_count (int): Number of data rows read from the worksheet
+        last_row (list): Last data row read, None if there are none
+    """
+    state[state_key] = {
+        'row_count': row_count,
+        'header': strip_trailing_blanks(header),
+        'last_row_hash': row_fingerprint(last_row) if row_count else None,
+        'refreshed_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+def append_new_rows(worksheet, state, state_key, output_path, transform):
+    """
+    Fetch only the rows added after the watermark and append them to output_path.
+    The header row, the last synced row and the new rows are read in a single
+    batch request. If the last synced row is no longer the same, rows were
+    deleted or moved above the watermark and new rows could land before it.
+
+    Args:
+        worksheet: gspread worksheet
+        state (dict): watermarks as returned by load_sync_state
+        state_key (str): "<spreadsheet_id>:<gid>"
+        output_path (str): semicolon CSV written by the last full refresh
+        transform (callable): turns [header] + rows into the output DataFrame
+
+    Returns:
+        int: Number of rows appended, or None if a full refresh is needed
+        (no watermark yet, missing output file, last full read older than
+        INCREMENTAL_FULL_REFRESH_HOURS, changed header or synced rows deleted or moved)
+    """
+    watermark = state.get(state_key)
+    if watermark is None or not os.path.exists(output_path):
+        return None
+
+    refreshed_at = watermark.get('refreshed_at')
+    max_age = timedelta(hours=INCREMENTAL_FULL_REFRESH_HOURS)
+    if refreshed_at is None or datetime.now() - datetime.fromisoformat(refreshed_at) >= max_age:
+        print(f"Info: last full read of {state_key} is older than {INCREMENTAL_FULL_REFRESH_HOURS}h, running a full refresh")
+        return None
+
+    # Sheet row 1 is the header, synced data rows follow it
+    synced_rows = watermark['row_count']
+    if worksheet.row_count < synced_rows + 1:
+        print(f"Info: {state_key} has fewer rows than were synced, running a full refresh")
+        return None
+    start_row = synced_rows + 2
+    ranges = ['1:1']
+    if synced_rows:
+        ranges.append(f"{synced_rows + 1}:{synced_rows + 1}")
+    if start_row <= worksheet.row_count:
+        ranges.append(f"{start_row}:{worksheet.row_count}")
+    value_ranges = worksheet.batch_get(ranges)
+
+    header = strip_trailing_blanks(value_ranges[0][0]) if value_ranges[0] else []
+    if header != watermark['header']:
+        print(f"Info: header of {state_key} changed, running a full refresh")
+        return None
+
+    if synced_rows:
+        last_row = value_ranges[1][0] if value_ranges[1] else []
+        if row_fingerprint(last_row) != watermark.get('last_row_hash'):
+            print(f"Info: synced rows of {state_key} were deleted or moved, running a full refresh")
+            return None
+
+    new_rows = value_ranges[-1] if start_row <= worksheet.row_count else []
+    appended_rows = 0
+    if new_rows:
+        width = len(header)
+        rows = [(list(row) + [''] * width)[:width] for row in new_rows]
+        df_new = transform([header] + rows)
+        if df_new is None:
+            return None
+        df_new.to_csv(output_path, sep=";", header=False, index=False, mode="a")
+        appended_rows = len(df_new)
+
+    watermark['row_count'] += len(new_rows)
+    if new_rows:
+        watermark['last_row_hash'] = row_fingerprint(new_rows[-1])
+    return appended_rows
+
+def stream_worksheet_to_csv(worksheet, output_path, transform, chunk_size=STREAM_CHUNK_ROWS,
+                            snapshot_manifest=None, snapshot_key=None, snapshot=None):
+    """
+    Read a worksheet in blocks of chunk_size rows and append each transformed
+    block to output_path, so peak memory depends on the chunk size rather
+    than on the size of the sheet. Blocks are written to a temporary file that
+    only replaces output_path if the content hash differs from the manifest.
+
+    Args:
+        worksheet: gspread worksheet
+        output_path (str): semicolon CSV to write
+        transform (callable): turns [header] + rows into the output DataFrame
+        chunk_size (int): number of data rows fetched per request
+        snapshot_manifest (dict): snapshot manifest, the hash is not checked if omitted
+        snapshot_key (str): "<spreadsheet_id>:<gid>"
+        snapshot: digest from snapshot_digest, the rows alone are hashed if omitted
+
+    Returns:
+        tuple: (header, data rows read, rows written, last data row), header is None
+        for an empty sheet and rows written is None when the previous output was kept
+    """
+    header = None
+    last_row = 1
+    last_values = None
+    rows_written = 0
+    if snapshot is None:
+        snapshot = hash_rows([])
+    tmp_path = f"{output_path}.tmp"
+
+    # The first block starts at the header row, sheet rows are 1-based
+    start_row = 1
+    while start_row <= worksheet.row_count:
+        end_row = start_row + chunk_size if header is None else start_row + chunk_size - 1
+        block = worksheet.get(f"{start_row}:{end_row}")
+        block_start = start_row
+        start_row = end_row + 1
+
+        if header is None:
+            if not block:
+                return None, 0, 0, None
+            header = strip_trailing_blanks(block[0])
+            hash_rows([header], snapshot)
+            block = block[1:]
+            block_start += 1
+        if not block:
+            continue
+
+        width = len(header)
+        rows = [(list(row) + [''] * width)[:width] for row in block]
+        hash_rows(rows, snapshot)
+        df_block = transform([header] + rows)
+        if df_block is None:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return header, 0, 0, None
+
+        df_block.to_csv(tmp_path, sep=";", header=last_row == 1, index=False,
+                        mode="w" if last_row == 1 else "a")
+        last_row = block_start + len(block) - 1
+        last_values = block[-1]
+        rows_written += len(df_block)
+
+    if header is not None and last_row == 1:
+        # Header only, still write an empty file with the output columns
+        df_empty = transform([header])
+        if df_empty is None:
+            return header, 0, 0, None
+        df_empty.to_csv(tmp_path, sep=";", header=True, index=False)
+
+    snapshot_hash = snapshot.hexdigest()
+    if snapshot_manifest is not None and is_unchanged(snapshot_manifest, snapshot_key, snapshot_hash, "csv", output_path):
+        os.remove(tmp_path)
+        return header, last_row - 1, None, last_values
+
+    os.replace(tmp_path, output_path)
+    if snapshot_manifest is not None:
+        record_snapshot(snapshot_manifest, snapshot_key, snapshot_hash, last_row - 1, output_path, "csv", output_path)
+
+    return header, last_row - 1, rows_written, last_values
+
+def write_output(df, output_path, output_format=OUTPUT_FORMAT, partition_by=OUTPUT_PARTITION_BY):
+    """
+    Write a job's output as semicolon CSV or as a columnar file.
+    Streaming and incremental appends always write CSV.
+
+    Args:
+        df (pd.DataFrame): Output of transform_sheet
+        output_path (str): CSV output path, the extension is swapped for columnar formats
+        output_format (str): "csv", "parquet" or "arrow"
+        partition_by (str): column to partition columnar output by, ignored if missing
+
+    Returns:
+        str: Path of the file or dataset directory written
+    """
+    if output_format == "csv":
+        df.to_csv(output_path, sep=";", header=True, index=False)
+        return output_path
+
+    output_path = columnar_output_path(output_path, output_format)
+    if partition_by not in df.columns:
+        partition_by = None
+    if partition_by is not None:
+        # Partitioned datasets are written to a directory
+        output_path = os.path.splitext(output_path)[0]
+
+    write_columnar(df, output_path, output_format, partition_by)
+    return output_path
 
 def is_valid_pos_code(pos_code):
     """
@@ -71,6 +536,20 @@ def is_valid_pos_code(pos_code):
         return False
     return True
 
+def is_valid_pos_code_column(pos_codes):
+    """
+    Column-level version of is_valid_pos_code, used as a boolean row filter.
+
+    Args:
+        pos_codes (pd.Series): Column of POS codes to validate
+
+    Returns:
+        pd.Series: True for valid POS codes, False otherwise
+    """
+    pos_codes = pd.Series(pos_codes)
+    stripped = pos_codes.astype(str).str.strip()
+    return pos_codes.notna() & ~stripped.isin(['', '-'])
+
 def clean_and_split_coordinates(coord_str):
     """
     Clean and split coordinates into latitude and longitude.
@@ -120,132 +599,124 @@ def clean_and_split_coordinates(coord_str):
     except ValueError:
         return "0.0", "0.0"
 
-def get_data_sheet_one():
-    """
-    Inserts data from a CSV file into a Google Spreadsheet.
-    Handles duplicate headers by making them unique.
-    Uses worksheet GID instead of index.
-    """
-    spreadsheet_id = "1YniWV0eQVH5cMRrrFLjevFnqaRz1bDagJHQYcM_pDF0"
-    worksheet_gids = ["1019753355"]
-
-    columns_to_keep = [
-        'POSCode',
-        'POS Name',
-        'Foto Lokasi Bagian Dalam',
-        'Foto Lokasi Bagian Depan',
-        'Lokasi',
-        'Kota/Kabupaten',
-        'Jenis Bangunan',
-        'Titik Kordinat',
-        'Address'
-    ]
+# "lat, lon" made of plain decimals, the format almost every row uses
+COORD_NUMBER_PATTERN = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
 
-    for gid in worksheet_gids:
-        try:
-            data_source = auth_to_google_v2(
-                # json_auth_file='/opt/airflow/modules/lp_pos_photo/google_auth.json',
-                json_auth_file='/Users/PARCEL/Downloads/testing_data_gsheet/google_auth.json',
-                spreadsheet_id=spreadsheet_id,
-                worksheet_gid=gid
-            )
-            
-            all_values = data_source.get_all_values()
-            if not all_values:
-                print(f"Warning: Sheet with GID {gid} is empty")
-                continue
-                
-            headers = all_values[0]
-            unique_headers = make_headers_unique(headers)
-            data_rows = all_values[1:]
-            
-            df = pd.DataFrame(data_rows, columns=unique_headers)
-            
-            selected_columns = []
-            for col in columns_to_keep:
-                matching_cols = [c for c in df.columns if c.startswith(col)]
-                selected_columns.extend(matching_cols)
-            
-            if not selected_columns:
-                print(f"Warning: None of the specified columns were found in the sheet")
-                print(f"Available columns: {', '.join(df.columns)}")
-                continue
-                
-            df_filtered = df[selected_columns]
-
-            # Find the Titik Kordinat column
-            coord_column = [col for col in df_filtered.columns if col.startswith('Titik Kordinat')][0]
-
-            # Create a temporary DataFrame to hold the split coordinates
-            coord_df = pd.DataFrame(
-                df_filtered[coord_column].apply(clean_and_split_coordinates).tolist(),
-                columns=['Latitude', 'Longitude']
-            )
-
-            # Count null/invalid coordinates that were converted to 0.0
-            null_coords = (coord_df['Latitude'] == "0.0") & (coord_df['Longitude'] == "0.0")
-            if null_coords.any():
-                print(f"Info: {null_coords.sum()} coordinates were null/invalid and set to 0.0")
-
-            # Add the coordinate columns to the main DataFrame
-            df_filtered['Latitude'] = coord_df['Latitude']
-            df_filtered['Longitude'] = coord_df['Longitude']
-
-            # Drop the original Titik Kordinat column
-            df_filtered = df_filtered.drop(columns=[coord_column])
-
-            # Rename all columns
-            df_final_col = df_filtered.rename(columns={
-                'POSCode'                   : 'pos_code',
-                'POS Name'                  : 'pos_name',
-                'Foto Lokasi Bagian Dalam'  : 'foto_lokasi_bagian_dalam',
-                'Foto Lokasi Bagian Depan'  : 'foto_lokasi_bagian_depan',
-                'Lokasi'                    : 'lokasi',
-                'Kota/Kabupaten'            : 'kota_kabupaten',
-                'Jenis Bangunan'            : 'jenis_bangunan',
-                'Latitude'                  : 'latitude',
-                'Longitude'                 : 'longitude',
-                'Address'                   : 'alamat'
-            })
+def match_coordinate_pairs(values):
+    """
+    Find the plain "lat, lon" cells of a column and parse them with the Arrow
+    string kernels. Without pyarrow no cell is matched, they all go through
+    clean_and_split_coordinates, which is faster than a per-cell regex.
 
-            # Ensure latitude and longitude are strings
-            df_final_col['latitude'] = df_final_col['latitude'].astype(str)
-            df_final_col['longitude'] = df_final_col['longitude'].astype(str)
+    Args:
+        values (np.ndarray): Object array of raw coordinate cells
 
-            # Filter out invalid POS codes
-            initial_rows = len(df_final_col)
-            df_final_col = df_final_col[df_final_col['pos_code'].apply(is_valid_pos_code)]
-            filtered_rows = initial_rows - len(df_final_col)
-            
-            if filtered_rows > 0:
-                print(f"Sheet 1: Filtered out {filtered_rows} rows with invalid POS codes")
-            
-            column_order = [
-                    'pos_code', 
-                    'foto_lokasi_bagian_dalam', 
-                    'foto_lokasi_bagian_depan', 
-                    'lokasi', 
-                    'kota_kabupaten', 
-                    'jenis_bangunan', 
-                    'latitude', 
-                    'longitude', 
-                    'alamat',
-                    'pos_name'
-                ]
-            
-            df_final_col = df_final_col[column_order]
-
-            # Save to CSV
-            # output_path = f"/opt/airflow/modules/lp_pos_photo/dataset/pos_code_master_photo_data_1.csv"
-            output_path = f"/Users/PARCEL/Downloads/testing_data_gsheet/dataset/pos_code_master_photo_data_1_test.csv"
-            df_final_col.to_csv(output_path, sep=";", header=True, index=False)
-            # print(f"Data types of columns:")
-            # print(df_final_col.dtypes)
-            # print(df_final_col.head())
-            print(f"Successfully saved {len(df_final_col)} rows of data from sheet GID {gid} to {output_path}")
-            
-        except Exception as e:
-            print(f"Error processing worksheet GID {gid}: {str(e)}")
+    Returns:
+        tuple: boolean mask of the matching cells, and a float64 array of
+        shape (matches, 2) with their latitude and longitude
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return np.zeros(len(values), dtype=bool), np.zeros((0, 2))
+
+    if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+        values = np.array([v if isinstance(v, str) else None for v in values], dtype=object)
+    cells = pa.array(values, type=pa.string(), from_pandas=True)
+    # RE2 \s and \d are ASCII only, cells with other spaces or digits are left to the fallback
+    parts = pc.extract_regex(cells, rf'^\s*(?P<lat>{COORD_NUMBER_PATTERN})\s*,\s*(?P<lon>{COORD_NUMBER_PATTERN})\s*$')
+    matched = parts.is_valid().to_numpy(zero_copy_only=False)
+    parts = parts.filter(parts.is_valid())
+    pairs = np.column_stack([
+        pc.cast(pc.struct_field(parts, name), pa.float64()).to_numpy(zero_copy_only=False)
+        for name in ('lat', 'lon')
+    ])
+    return matched, pairs.reshape(-1, 2)
+
+def format_floats(numbers):
+    """
+    str() of every value of a float64 array, cast by Arrow when pyarrow is installed
+
+    Args:
+        numbers (np.ndarray): float64 values
+
+    Returns:
+        np.ndarray: Object array of strings, e.g. "-6.2", "106.0" or "1e-05"
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return np.array(list(map(str, numbers.tolist())), dtype=object)
+
+    text = pc.cast(pa.array(numbers), pa.string())
+    # Arrow writes whole numbers without ".0", and switches to exponent notation
+    # at other magnitudes than Python: those few values are formatted by str()
+    odd = pc.match_substring(text, 'e').to_numpy(zero_copy_only=False) | (np.abs(numbers) < 1e-4)
+    text = text.to_numpy(zero_copy_only=False)
+    whole = (numbers == np.trunc(numbers)) & ~odd
+    text[whole] = text[whole] + '.0'
+    text[odd] = list(map(str, numbers[odd].tolist()))
+    return text
+
+def split_coordinates_column(coord_series, as_float=False):
+    """
+    Column-level version of clean_and_split_coordinates.
+    Blank cells and the common "lat, lon" cells are handled on whole arrays:
+    the pairs are matched and parsed with Arrow string kernels, range checked
+    as float64 and formatted back in one cast. Every other cell (period or
+    space separated, odd float() syntax) goes through
+    clean_and_split_coordinates, so the output matches it row for row.
+
+    Args:
+        coord_series (pd.Series): Column containing raw coordinate strings
+        as_float (bool): Return float64 columns instead of strings
+
+    Returns:
+        pd.DataFrame: 'Latitude' and 'Longitude' columns aligned to coord_series
+    """
+    coords = pd.Series(coord_series)
+    values = coords.to_numpy(dtype=object)
+
+    matched, pairs = match_coordinate_pairs(values)
+
+    # Basic validation of coordinate ranges
+    in_range = (
+        (pairs[:, 0] >= -90) & (pairs[:, 0] <= 90)
+        & (pairs[:, 1] >= -180) & (pairs[:, 1] <= 180)
+    )
+    pairs[~in_range] = 0.0
+
+    latitude = np.zeros(len(values))
+    longitude = np.zeros(len(values))
+    latitude[matched] = pairs[:, 0]
+    longitude[matched] = pairs[:, 1]
+
+    # Null, blank and "0" cells are 0.0 as well
+    text = coords[~matched].astype(str).str.strip()
+    blank = coords[~matched].isna() | text.isin(['', '0'])
+    slow = ~matched
+    slow[slow] = ~blank.to_numpy()
+
+    if not as_float:
+        formatted = np.full(len(values), "0.0", dtype=object)
+        formatted[matched] = format_floats(pairs[:, 0])
+        latitude = formatted
+        formatted = np.full(len(values), "0.0", dtype=object)
+        formatted[matched] = format_floats(pairs[:, 1])
+        longitude = formatted
+
+    if slow.any():
+        slow_pairs = [clean_and_split_coordinates(v) for v in values[slow]]
+        latitude[slow] = [float(lat) if as_float else lat for lat, _ in slow_pairs]
+        longitude[slow] = [float(lon) if as_float else lon for _, lon in slow_pairs]
+
+    return pd.DataFrame(
+        {'Latitude': latitude, 'Longitude': longitude},
+        index=coords.index,
+        dtype=float if as_float else object
+    )
 
 def format_timestamp(timestamp):
     """
@@ -269,184 +740,362 @@ def format_timestamp(timestamp):
     except:
         return '31-12-9999'
 
+def format_timestamp_column(timestamps):
+    """
+    Column-level version of format_timestamp with the same zero padding
+    and '31-12-9999' fallback for null, blank and malformed values.
+    Dates repeat heavily, so each distinct value is formatted once.
 
+    Args:
+        timestamps (pd.Series): Column of DD/MM/YYYY timestamps
 
-def get_data_sheet_two():
+    Returns:
+        pd.Series: Formatted timestamps
     """
-    Inserts data from a CSV file into a Google Spreadsheet.
-    Handles duplicate headers by making them unique.
-    Uses worksheet GID instead of index.
+    timestamps = pd.Series(timestamps)
+    codes, uniques = pd.factorize(timestamps)
+    uniques = pd.Series(uniques, dtype=object)
+
+    if pd.api.types.infer_dtype(uniques, skipna=True) not in ('string', 'empty'):
+        formatted = uniques.apply(format_timestamp)
+    else:
+        formatted = pd.Series('31-12-9999', index=uniques.index, dtype=object)
+
+        # Handle the case where timestamp might already contain hyphens
+        slashed = uniques.str.replace('-', '/', regex=False)
+        has_date = ~uniques.str.strip().isin(['', '-']) & (slashed.str.count('/') == 2)
+
+        if has_date.any():
+            # Split the date components into day, month and year columns
+            parts = slashed[has_date].str.split('/', expand=True)
+            formatted[has_date] = parts[2].str.zfill(4) + '-' + parts[1].str.zfill(2) + '-' + parts[0].str.zfill(2)
+
+    # Null values have code -1, which picks the trailing sentinel
+    lookup = np.append(formatted.to_numpy(dtype=object), '31-12-9999')
+    return pd.Series(lookup[codes], index=timestamps.index, dtype=object)
+
+def dedup_latest_uploads(df):
     """
-    spreadsheet_id = "1VW0AFMpkjLVa1muXmV8JxTWaTUQ_6_SukNlxHssPdwQ"
-    # Define the GIDs of the worksheets you want to process
-    worksheet_gids = ["1868279837"]  # You can add more GIDs to this list
+    Keep one sheet 2 row per POS code, with the duplicate rule of
+    pos_master.latest_upload_positions
 
-    # Define the columns we want to keep
-    columns_to_keep = [
-        'P.O.S Code',
-        'FOTO 1 (TAMPAK DEPAN)',
-        'FOTO 2 (TAMPAK DALAM)',
-        'FOTO 4 (TAMBAHAN DETAIL LOKASI POS)',
-        'Status Upload',
-        'Timestamp'
-    ]
+    Args:
+        df (pd.DataFrame): Transformed sheet 2 rows
+
+    Returns:
+        tuple: (deduplicated DataFrame in the original row order, number of rows dropped)
+    """
+    keep = latest_upload_positions(df)
+    return df.iloc[keep], len(df) - len(keep)
+
+@register_stage('split_coordinates')
+def split_coordinates_stage(df, spec, column, into):
+    """
+    Split the first column starting with `column` into latitude and longitude columns
+
+    Args:
+        df (pd.DataFrame): Rows of the sheet
+        spec (dict): Sheet spec
+        column (str): Prefix of the "lat, lon" column, the column is dropped
+        into (list): Names of the latitude and longitude columns
+    """
+    coord_column = [col for col in df.columns if col.startswith(column)][0]
+    coord_df = split_coordinates_column(df[coord_column])
+
+    # Count null/invalid coordinates that were converted to 0.0
+    null_coords = (coord_df['Latitude'] == "0.0") & (coord_df['Longitude'] == "0.0")
+    if null_coords.any():
+        print(f"Info: {null_coords.sum()} coordinates were null/invalid and set to 0.0")
+
+    df[into[0]] = coord_df['Latitude']
+    df[into[1]] = coord_df['Longitude']
+    return df.drop(columns=[coord_column])
+
+@register_stage('rename')
+def rename_stage(df, spec, columns):
+    """
+    Rename columns, names missing from the sheet are ignored
+
+    Args:
+        df (pd.DataFrame): Rows of the sheet
+        spec (dict): Sheet spec
+        columns (dict): Current name -> output name
+    """
+    return df.rename(columns=columns)
+
+@register_stage('filter_valid_pos_code')
+def filter_valid_pos_code_stage(df, spec, column):
+    """
+    Drop the rows whose POS code is empty, '-' or null
+
+    Args:
+        df (pd.DataFrame): Rows of the sheet
+        spec (dict): Sheet spec
+        column (str): POS code column
+    """
+    initial_rows = len(df)
+    df = df[is_valid_pos_code_column(df[column])]
+    filtered_rows = initial_rows - len(df)
+
+    if filtered_rows > 0:
+        print(f"{spec['name']}: Filtered out {filtered_rows} rows with invalid POS codes")
+    return df
+
+@register_stage('format_timestamp')
+def format_timestamp_stage(df, spec, column):
+    """
+    Convert a DD/MM/YYYY column to YYYY-MM-DD
+
+    Args:
+        df (pd.DataFrame): Rows of the sheet
+        spec (dict): Sheet spec
+        column (str): Timestamp column
+    """
+    df = df.copy()
+    df[column] = format_timestamp_column(df[column])
+    return df
+
+@register_stage('select_columns')
+def select_columns_stage(df, spec, columns):
+    """
+    Keep and order the output columns
+
+    Args:
+        df (pd.DataFrame): Rows of the sheet
+        spec (dict): Sheet spec
+        columns (list): Output columns in order
+    """
+    return df[columns]
+
+def sheet_output_path(spec):
+    """
+    Get the CSV output path of a sheet spec
+
+    Args:
+        spec (dict): Sheet spec
+
+    Returns:
+        str: Output path inside OUTPUT_DIR
+    """
+    return os.path.join(OUTPUT_DIR, f"{spec['output']}{OUTPUT_SUFFIX}.csv")
+
+def snapshot_digest(spec, output_path):
+    """
+    Start the content hash of a worksheet with the config its output depends
+    on, so editing the spec or moving the output invalidates the snapshot
+
+    Args:
+        spec (dict): Sheet spec
+        output_path (str): CSV output path of the job
+
+    Returns:
+        hashlib object: digest to feed the worksheet rows into
+    """
+    return hash_rows([[json.dumps(spec, sort_keys=True), str(OUTPUT_PARTITION_BY), output_path]])
+
+def is_incremental(spec):
+    """
+    Whether a sheet is synced by appending new rows.
+    Deduplicated sheets need the whole worksheet, and only CSV outputs can be
+    appended to, so neither is synced incrementally.
+
+    Args:
+        spec (dict): Sheet spec
+    """
+    return bool(spec.get('incremental')) and not spec.get('dedup') and OUTPUT_FORMAT == "csv"
+
+def keeps_watermark(spec):
+    """
+    Whether the output of a full export can later be appended to
+
+    Args:
+        spec (dict): Sheet spec
+    """
+    return not spec.get('dedup') and OUTPUT_FORMAT == "csv"
+
+def run_sheet_job(spec, session=None, prefetched=None, chunk_size=None, metrics=NO_METRICS):
+    """
+    Export the worksheets of a sheet spec: fetch (or append / stream),
+    transform with the spec stages and write the output.
 
-    for gid in worksheet_gids:
+    Args:
+        spec (dict): Sheet spec
+        session (SheetsSession): shared Sheets client, a new one is created if omitted
+        prefetched (dict): worksheet values from fetch_worksheet_values
+        chunk_size (int): stream the worksheet in blocks of this many rows
+        metrics (MetricsRecorder): records every stage of the job
+    """
+    check_stages(spec)
+
+    if session is None:
+        session = SheetsSession(metrics=metrics)
+
+    dedup = bool(spec.get('dedup'))
+    incremental = is_incremental(spec)
+    if dedup or OUTPUT_FORMAT != "csv":
+        # Streaming writes CSV blocks and needs the whole sheet undeduplicated
+        chunk_size = None
+
+    spreadsheet_id = spec['spreadsheet_id']
+    output_path = sheet_output_path(spec)
+
+    sync_state = load_sync_state(SYNC_STATE_FILE)
+
+    snapshot_manifest = load_manifest(SNAPSHOT_MANIFEST_FILE)
+
+    for gid in spec['gids']:
         try:
-            data_source = auth_to_google_v2(
-                # json_auth_file='/opt/airflow/modules/lp_pos_photo/google_auth.json',
-                json_auth_file='/Users/PARCEL/Downloads/testing_data_gsheet/google_auth.json',
-                spreadsheet_id=spreadsheet_id,
-                worksheet_gid=gid
-            )
-            
+            state_key = f"{spreadsheet_id}:{gid}"
+
+            def transform(all_values):
+                return transform_sheet(spec, all_values, metrics, gid=gid)
+
+            if incremental:
+                worksheet = session.worksheet(spreadsheet_id, gid)
+                with metrics.stage('append', sheet=spec['name'], gid=gid) as record:
+                    appended_rows = append_new_rows(
+                        worksheet, sync_state, state_key, output_path, transform)
+                    record['rows_out'] = appended_rows
+                if appended_rows is not None:
+                    # The output no longer matches the last full snapshot
+                    if appended_rows:
+                        snapshot_manifest.pop(state_key, None)
+                    print(f"Successfully appended {appended_rows} new rows of data from sheet GID {gid} to {output_path}")
+                    continue
+
+            if chunk_size:
+                worksheet = session.worksheet(spreadsheet_id, gid)
+                with metrics.stage('stream', sheet=spec['name'], gid=gid, chunk_size=chunk_size) as record:
+                    header, rows_read, rows_written, last_values = stream_worksheet_to_csv(
+                        worksheet, output_path, transform, chunk_size,
+                        snapshot_manifest, state_key, snapshot_digest(spec, output_path))
+                    record['rows_in'] = rows_read
+                    record['rows_out'] = rows_written
+                if header is None:
+                    print(f"Warning: Sheet with GID {gid} is empty")
+                    continue
+                record_sync_watermark(sync_state, state_key, header, rows_read, last_values)
+                if rows_written is None:
+                    print(f"Sheet with GID {gid} is unchanged since the last run, keeping {output_path}")
+                else:
+                    print(f"Successfully saved {rows_written} rows of data from sheet GID {gid} to {output_path}")
+                continue
+
             # Get all values including headers
-            all_values = data_source.get_all_values()
+            all_values = get_worksheet_values(session, spreadsheet_id, gid, prefetched, metrics)
             if not all_values:
                 print(f"Warning: Sheet with GID {gid} is empty")
                 continue
-                
-            # Get headers and make them unique
-            headers = all_values[0]
-            unique_headers = make_headers_unique(headers)
-            
-            # Get the data rows
-            data_rows = all_values[1:]
-            
-            df = pd.DataFrame(data_rows, columns=unique_headers)
-            
-            # Find the columns that match our desired columns
-            selected_columns = []
-            for col in columns_to_keep:
-                matching_cols = [c for c in df.columns if c.startswith(col)]
-                selected_columns.extend(matching_cols)
-            
-            # Filter DataFrame to keep only the desired columns
-            if not selected_columns:
-                print(f"Warning: None of the specified columns were found in the sheet")
-                print(f"Available columns: {', '.join(df.columns)}")
+
+            with metrics.stage('snapshot_hash', sheet=spec['name'], gid=gid) as record:
+                snapshot_hash = hash_rows(all_values, snapshot_digest(spec, output_path)).hexdigest()
+                unchanged = is_unchanged(snapshot_manifest, state_key, snapshot_hash, OUTPUT_FORMAT, output_path)
+                record['unchanged'] = unchanged
+            if unchanged:
+                if keeps_watermark(spec):
+                    record_sync_watermark(sync_state, state_key, all_values[0], len(all_values) - 1, all_values[-1])
+                else:
+                    sync_state.pop(state_key, None)
+                print(f"Sheet with GID {gid} is unchanged since the last run, keeping {snapshot_manifest[state_key]['output_path']}")
                 continue
-                
-            df_filtered = df[selected_columns]
-
-            df_final_col = df_filtered.rename(columns={
-                'P.O.S Code': 'pos_code',
-                'FOTO 2 (TAMPAK DALAM)': 'foto_lokasi_bagian_dalam',
-                'FOTO 1 (TAMPAK DEPAN)': 'foto_lokasi_bagian_depan',
-                'FOTO 4 (TAMBAHAN DETAIL LOKASI POS)': 'foto_tambahan_lokasi_pos',
-                'Status Upload': 'status_upload',
-                'Timestamp': 'timestamp'
-            })
 
-            # Filter out invalid POS codes before timestamp conversion
-            initial_rows = len(df_final_col)
-            df_final_col = df_final_col[df_final_col['pos_code'].apply(is_valid_pos_code)]
-            filtered_rows = initial_rows - len(df_final_col)
-            
-            if filtered_rows > 0:
-                print(f"Sheet 2: Filtered out {filtered_rows} rows with invalid POS codes")
-
-            # Convert timestamp after filtering
-            df_final_col['timestamp'] = df_final_col['timestamp'].apply(format_timestamp)
-            # print(df_final_col)
-            # df_cek_type = df_final_col
-            # print(df_cek_type.dtypes)
-            
-            # Save to CSV
-            # output_path = f"/opt/airflow/modules/lp_pos_photo/dataset/pos_code_master_photo_data_2.csv"
-            output_path = f"/Users/PARCEL/Downloads/testing_data_gsheet/dataset/pos_code_master_photo_data_2_test.csv"
-            df_final_col.to_csv(output_path, sep=";", header=True, index=False)
-            print(f"Successfully saved {len(df_final_col)} rows of data from sheet GID {gid} to {output_path}")
-            
+            df_final_col = transform(all_values)
+            if df_final_col is None:
+                continue
+
+            if dedup:
+                with metrics.stage('dedup', sheet=spec['name'], gid=gid) as record:
+                    record['rows_in'] = len(df_final_col)
+                    df_final_col, dropped_rows = dedup_latest_uploads(df_final_col)
+                    record['rows_out'] = len(df_final_col)
+                print(f"{spec['name']}: Dropped {dropped_rows} older uploads of the same POS code")
+
+            # Save to CSV (or the configured columnar format)
+            with metrics.stage('write', sheet=spec['name'], gid=gid, output_format=OUTPUT_FORMAT) as record:
+                record['rows_in'] = len(df_final_col)
+                written_path = write_output(df_final_col, output_path, OUTPUT_FORMAT, OUTPUT_PARTITION_BY)
+                if os.path.isfile(written_path):
+                    record['bytes_written'] = os.path.getsize(written_path)
+            record_snapshot(snapshot_manifest, state_key, snapshot_hash, len(all_values) - 1, written_path, OUTPUT_FORMAT, output_path)
+            if keeps_watermark(spec):
+                record_sync_watermark(sync_state, state_key, all_values[0], len(all_values) - 1, all_values[-1])
+            else:
+                # New rows cannot be appended to a deduplicated or columnar output
+                sync_state.pop(state_key, None)
+            print(f"Successfully saved {len(df_final_col)} rows of data from sheet GID {gid} to {written_path}")
+
         except Exception as e:
             print(f"Error processing worksheet GID {gid}: {str(e)}")
+            metrics.emit({
+                'stage': 'job', 'sheet': spec['name'], 'gid': gid,
+                'status': 'error', 'error': f"{type(e).__name__}: {e}"
+            })
 
-def get_data_sheet_three():
+    save_sync_state(sync_state, SYNC_STATE_FILE)
+    save_manifest(snapshot_manifest, SNAPSHOT_MANIFEST_FILE)
+
+def get_data_sheet_one(session=None, prefetched=None, chunk_size=None):
     """
-    Inserts data from a CSV file into a Google Spreadsheet.
-    Handles duplicate headers by making them unique.
-    Uses worksheet GID instead of index.
+    Export the POS master sheet (sheet_specs/pos_code_master_photo_data_1.json)
+
+    Args:
+        session (SheetsSession): shared Sheets client, a new one is created if omitted
+        prefetched (dict): worksheet values from fetch_worksheet_values
+        chunk_size (int): stream the worksheet in blocks of this many rows
     """
-    spreadsheet_id = "1YniWV0eQVH5cMRrrFLjevFnqaRz1bDagJHQYcM_pDF0"
-    worksheet_gids = ["706015433"]
+    spec = load_sheet_spec('pos_code_master_photo_data_1')
+    run_sheet_job(spec, session, prefetched, chunk_size)
 
-    columns_to_keep = [
-        'Poscode Genesis',
-        'Cons Code',
-        'Nama Konsol',
-        'Keterangan'
-    ]
+def get_data_sheet_two(session=None, prefetched=None, incremental=None, chunk_size=None, dedup=None):
+    """
+    Export the photo upload log (sheet_specs/pos_code_master_photo_data_2.json)
 
-    for gid in worksheet_gids:
-        try:
-            data_source = auth_to_google_v2(
-                # json_auth_file='/opt/airflow/modules/lp_pos_photo/google_auth.json',
-                json_auth_file='/Users/PARCEL/Downloads/testing_data_gsheet/google_auth.json',
-                spreadsheet_id=spreadsheet_id,
-                worksheet_gid=gid
-            )
-            
-            all_values = data_source.get_all_values()
-            if not all_values:
-                print(f"Warning: Sheet with GID {gid} is empty")
-                continue
-                
-            headers = all_values[0]
-            unique_headers = make_headers_unique(headers)
-            data_rows = all_values[1:]
-            
-            df = pd.DataFrame(data_rows, columns=unique_headers)
-            
-            selected_columns = []
-            for col in columns_to_keep:
-                matching_cols = [c for c in df.columns if c.startswith(col)]
-                selected_columns.extend(matching_cols)
-            
-            if not selected_columns:
-                print(f"Warning: None of the specified columns were found in the sheet")
-                print(f"Available columns: {', '.join(df.columns)}")
-                continue
-                
-            df_filtered = df[selected_columns]
-
-            # Rename all columns
-            df_final_col = df_filtered.rename(columns={
-                'Poscode Genesis'           : 'pos_code_genesis',
-                'Cons Code'                 : 'console_code',
-                'Nama Konsol'               : 'console_name',
-                'Keterangan'                : 'keterangan'
-            })
+    Args:
+        session (SheetsSession): shared Sheets client, a new one is created if omitted
+        prefetched (dict): worksheet values from fetch_worksheet_values
+        incremental (bool): only fetch and append rows added since the last run, defaults to the spec
+        chunk_size (int): stream the worksheet in blocks of this many rows
+        dedup (bool): keep only the latest upload per POS code, defaults to the spec
+    """
+    spec = load_sheet_spec('pos_code_master_photo_data_2')
+    if incremental is not None:
+        spec['incremental'] = incremental
+    if dedup is not None:
+        spec['dedup'] = dedup
+    run_sheet_job(spec, session, prefetched, chunk_size)
 
-            # Filter out invalid POS codes
-            initial_rows = len(df_final_col)
-            df_final_col = df_final_col[df_final_col['pos_code_genesis'].apply(is_valid_pos_code)]
-            filtered_rows = initial_rows - len(df_final_col)
-            
-            if filtered_rows > 0:
-                print(f"Sheet 3: Filtered out {filtered_rows} rows with invalid POS codes")
-            
-            column_order = [
-                'pos_code_genesis',
-                'console_code',
-                'console_name',
-                'keterangan'
-                ]
-            
-            df_final_col = df_final_col[column_order]
-
-            # Save to CSV
-            # output_path = f"/opt/airflow/modules/lp_pos_photo/dataset/pos_code_master_photo_data_3.csv"
-            output_path = f"/Users/PARCEL/Downloads/testing_data_gsheet/dataset/pos_code_master_photo_data_3_test.csv"
-            df_final_col.to_csv(output_path, sep=";", header=True, index=False)
-            # print(f"Data types of columns:")
-            # print(df_final_col.dtypes)
-            # print(df_final_col.head())
-            print(f"Successfully saved {len(df_final_col)} rows of data from sheet GID {gid} to {output_path}")
-            
-        except Exception as e:
-            print(f"Error processing worksheet GID {gid}: {str(e)}")
+def get_data_sheet_three(session=None, prefetched=None, chunk_size=None):
+    """
+    Export the console mapping sheet (sheet_specs/pos_code_master_photo_data_3.json)
+
+    Args:
+        session (SheetsSession): shared Sheets client, a new one is created if omitted
+        prefetched (dict): worksheet values from fetch_worksheet_values
+        chunk_size (int): stream the worksheet in blocks of this many rows
+    """
+    spec = load_sheet_spec('pos_code_master_photo_data_3')
+    run_sheet_job(spec, session, prefetched, chunk_size)
 
 if __name__ == "__main__":
-    get_data_sheet_one()
-    get_data_sheet_two()
-    get_data_sheet_three()
\ No newline at end of file
+    metrics = MetricsRecorder(METRICS_FILE)
+    session = SheetsSession(metrics=metrics)
+    sheet_specs = load_sheet_specs()
+    for spec in sheet_specs:
+        check_stages(spec)
+
+    # Fetch every configured worksheet up front, then transform and write per sheet.
+    # Incremental and streamed sheets fetch their own row ranges instead.
+    chunk_size = STREAM_CHUNK_ROWS if STREAM_WORKSHEETS and OUTPUT_FORMAT == "csv" else None
+    targets = [
+        (spec['spreadsheet_id'], gid)
+        for spec in sheet_specs
+        if not is_incremental(spec) and (not chunk_size or spec.get('dedup'))
+        for gid in spec['gids']
+    ]
+    prefetched = fetch_worksheet_values(session, targets, metrics=metrics)
+
+    for spec in sheet_specs:
+        run_sheet_job(spec, session, prefetched, chunk_size, metrics)
+
+    metrics.emit({'stage': 'sheets_requests', **session.scheduler.stats()})
+    print(f"Sheets API usage: {session.scheduler.stats()}")
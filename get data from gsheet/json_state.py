@@ -0,0 +1,36 @@
+"""
+JSON state files of the gsheet jobs: sync watermarks, snapshot manifest and
+photo cache index. A file is read whole, and written to a temporary file
+that then replaces it atomically, so an interrupted run never leaves a
+truncated state file behind.
+"""
+import json
+import os
+
+def load_json_state(path):
+    """
+    Load a JSON state file
+
+    Args:
+        path (str): path of the json file
+
+    Returns:
+        dict: content of the file, empty if there is no file yet
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_json_state(state, path):
+    """
+    Write a JSON state file, replacing the file atomically
+
+    Args:
+        state (dict): content to write
+        path (str): path of the json file
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
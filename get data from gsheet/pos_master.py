@@ -0,0 +1,196 @@
+"""
+Joined POS master built from the three pos_code_master_photo_data outputs.
+Rows are indexed by normalized POS code in one pass over each frame, so the
+denormalized table and ad-hoc lookups need no pandas merges.
+
+Duplicate rules:
+    sheet 1 (POS master)    the last row of a POS code wins
+    sheet 2 (photo uploads) the latest APPROVE upload wins, if a POS has no
+                            APPROVE upload the latest upload wins; ties go to
+                            the later row and rows without a valid date count
+                            as the oldest
+    sheet 3 (consoles)      the last row of a POS code wins
+"""
+import os
+import numpy as np
+import pandas as pd
+from sheet_pipeline import load_sheet_spec
+
+# Sheet specs of the three inputs, and name of the joined output in OUTPUT_DIR
+SHEET_SPEC_NAMES = ['pos_code_master_photo_data_1', 'pos_code_master_photo_data_2', 'pos_code_master_photo_data_3']
+JOINED_OUTPUT = 'pos_code_master_photo_data_joined'
+
+# Sheet 2 columns that clash with sheet 1 get an upload_ prefix
+SHEET_TWO_COLUMNS = {
+    'foto_lokasi_bagian_depan': 'upload_foto_lokasi_bagian_depan',
+    'foto_lokasi_bagian_dalam': 'upload_foto_lokasi_bagian_dalam',
+    'foto_tambahan_lokasi_pos': 'foto_tambahan_lokasi_pos',
+    'status_upload': 'status_upload',
+    'timestamp': 'timestamp'
+}
+
+def normalize_pos_code(pos_code):
+    """
+    Normalize a POS code for matching across sheets ('Pos123 ' -> 'POS123')
+
+    Args:
+        pos_code (str): Raw POS code
+
+    Returns:
+        str: Stripped, upper-case POS code
+    """
+    return str(pos_code).strip().upper()
+
+def latest_upload_positions(df):
+    """
+    Apply the sheet 2 duplicate rule: pick the upload kept for each POS code
+
+    Args:
+        df (pd.DataFrame): Sheet 2 rows with pos_code, status_upload and
+            timestamp (YYYY-MM-DD, as written by format_timestamp) columns
+
+    Returns:
+        np.ndarray: Sorted row positions of the kept uploads, one per normalized POS code
+    """
+    missing = pd.Series('', index=df.index)
+    timestamps = df.get('timestamp', missing).astype(str)
+    ranks = pd.DataFrame({
+        'pos_code': df['pos_code'].astype(str).str.strip().str.upper().to_numpy(),
+        'approved': (df.get('status_upload', missing).astype(str).str.strip().str.upper() == 'APPROVE').to_numpy(),
+        'timestamp': timestamps.where(timestamps.str.fullmatch(r'\d{4}-\d{2}-\d{2}'), '').to_numpy(),
+        'position': np.arange(len(df))
+    })
+
+    # The kept upload of each POS code sorts last within its group
+    ranks = ranks.sort_values(['pos_code', 'approved', 'timestamp', 'position'])
+    return np.sort(ranks.loc[~ranks['pos_code'].duplicated(keep='last'), 'position'].to_numpy())
+
+class PosMasterIndex:
+    """
+    Hash index of the three POS outputs keyed by normalized POS code.
+    """
+
+    def __init__(self, df_one, df_two, df_three):
+        """
+        Args:
+            df_one (pd.DataFrame): transform_sheet output of sheet_specs/pos_code_master_photo_data_1.json
+            df_two (pd.DataFrame): transform_sheet output of sheet_specs/pos_code_master_photo_data_2.json
+            df_three (pd.DataFrame): transform_sheet output of sheet_specs/pos_code_master_photo_data_3.json
+        """
+        self.columns_one = [c for c in df_one.columns if c != 'pos_code']
+        self.columns_two = [SHEET_TWO_COLUMNS.get(c, c) for c in df_two.columns if c != 'pos_code']
+        self.columns_three = [c for c in df_three.columns if c != 'pos_code_genesis']
+
+        self.sheet_one = {}
+        self.sheet_two = {}
+        self.sheet_three = {}
+        self.upload_counts = {}
+        self.duplicates = {'sheet_1': 0, 'sheet_2': 0, 'sheet_3': 0}
+
+        for pos_code, *values in zip(*[df_one[c].tolist() for c in ['pos_code'] + self.columns_one]):
+            key = normalize_pos_code(pos_code)
+            if key in self.sheet_one:
+                self.duplicates['sheet_1'] += 1
+            self.sheet_one[key] = dict(zip(self.columns_one, values))
+
+        columns_two = [c for c in df_two.columns if c != 'pos_code']
+        keys_two = [normalize_pos_code(pos_code) for pos_code in df_two['pos_code'].tolist()]
+        rows_two = list(zip(*[df_two[c].tolist() for c in columns_two]))
+        kept = {keys_two[position]: position for position in latest_upload_positions(df_two).tolist()}
+        for key in keys_two:
+            self.upload_counts[key] = self.upload_counts.get(key, 0) + 1
+        self.duplicates['sheet_2'] = len(keys_two) - len(self.upload_counts)
+        # In order of first appearance, as for the other sheets
+        for key in self.upload_counts:
+            self.sheet_two[key] = dict(zip(self.columns_two, rows_two[kept[key]]))
+
+        for pos_code, *values in zip(*[df_three[c].tolist() for c in ['pos_code_genesis'] + self.columns_three]):
+            key = normalize_pos_code(pos_code)
+            if key in self.sheet_three:
+                self.duplicates['sheet_3'] += 1
+            self.sheet_three[key] = dict(zip(self.columns_three, values))
+
+        # Sheet 1 order first, then POS codes only found in sheets 2 or 3
+        self.pos_codes = list(dict.fromkeys([*self.sheet_one, *self.sheet_two, *self.sheet_three]))
+
+    @classmethod
+    def from_csv(cls, path_one, path_two, path_three):
+        """
+        Build the index from the semicolon CSV outputs of the three jobs
+
+        Args:
+            path_one (str): pos_code_master_photo_data_1 output
+            path_two (str): pos_code_master_photo_data_2 output
+            path_three (str): pos_code_master_photo_data_3 output
+        """
+        frames = [
+            pd.read_csv(path, sep=";", dtype=str, keep_default_na=False)
+            for path in [path_one, path_two, path_three]
+        ]
+        return cls(*frames)
+
+    def __len__(self):
+        return len(self.pos_codes)
+
+    def __contains__(self, pos_code):
+        key = normalize_pos_code(pos_code)
+        return key in self.sheet_one or key in self.sheet_two or key in self.sheet_three
+
+    def lookup(self, pos_code):
+        """
+        Get the joined record of one POS without building the full table
+
+        Args:
+            pos_code (str): POS code in any casing or padding
+
+        Returns:
+            dict: Joined record, None if the POS code is in none of the sheets
+        """
+        key = normalize_pos_code(pos_code)
+        one = self.sheet_one.get(key)
+        two = self.sheet_two.get(key)
+        three = self.sheet_three.get(key)
+        if one is None and two is None and three is None:
+            return None
+        return self._record(key, one, two, three)
+
+    def _record(self, key, one, two, three):
+        record = {'pos_code': key}
+        record.update(one or dict.fromkeys(self.columns_one, ''))
+        record.update(two or dict.fromkeys(self.columns_two, ''))
+        record['upload_count'] = self.upload_counts.get(key, 0)
+        record.update(three or dict.fromkeys(self.columns_three, ''))
+        record['in_sheet_1'] = one is not None
+        record['in_sheet_2'] = two is not None
+        record['in_sheet_3'] = three is not None
+        return record
+
+    def to_frame(self):
+        """
+        Build the denormalized master table, one row per normalized POS code
+
+        Returns:
+            pd.DataFrame: Joined POS master
+        """
+        records = [
+            self._record(key, self.sheet_one.get(key), self.sheet_two.get(key), self.sheet_three.get(key))
+            for key in self.pos_codes
+        ]
+        columns = (
+            ['pos_code'] + self.columns_one + self.columns_two + ['upload_count']
+            + self.columns_three + ['in_sheet_1', 'in_sheet_2', 'in_sheet_3']
+        )
+        return pd.DataFrame.from_records(records, columns=columns)
+
+if __name__ == "__main__":
+    # Imported here, the export job imports this module for its dedup stage
+    from get_data_gsheet_v2_used_in_prod import OUTPUT_DIR, OUTPUT_SUFFIX, sheet_output_path
+
+    input_paths = [sheet_output_path(load_sheet_spec(name)) for name in SHEET_SPEC_NAMES]
+    output_path = os.path.join(OUTPUT_DIR, f"{JOINED_OUTPUT}{OUTPUT_SUFFIX}.csv")
+
+    pos_master = PosMasterIndex.from_csv(*input_paths)
+    df_master = pos_master.to_frame()
+    df_master.to_csv(output_path, sep=";", header=True, index=False)
+    print(f"Duplicate rows resolved: {pos_master.duplicates}")
+    print(f"Successfully saved {len(df_master)} POS rows to {output_path}")
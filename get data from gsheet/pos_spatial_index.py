@@ -0,0 +1,272 @@
+"""
+Grid index over the POS coordinates of the pos_code_master_photo_data_1 output
+for nearest-POS and bounding-box queries without scanning the whole file.
+Points are bucketed into square cells of CELL_SIZE_DEG degrees and stored
+sorted by cell, so a query only looks at the cells around it.
+"""
+import os
+import numpy as np
+import pandas as pd
+from sheet_pipeline import load_sheet_spec
+
+# Sheet spec of the indexed output, and name of the index written to OUTPUT_DIR
+SHEET_SPEC_NAME = 'pos_code_master_photo_data_1'
+INDEX_OUTPUT = 'pos_spatial_index'
+
+# About 5.5 km at the equator
+CELL_SIZE_DEG = 0.05
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Great-circle distance from one point to many
+
+    Args:
+        lat (float): Latitude of the point
+        lon (float): Longitude of the point
+        lats (np.ndarray): Latitudes of the other points
+        lons (np.ndarray): Longitudes of the other points
+
+    Returns:
+        np.ndarray: Distances in km
+    """
+    lat, lon, lats, lons = np.radians(lat), np.radians(lon), np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class PosSpatialIndex:
+    """
+    Grid bucket index of POS coordinates.
+    """
+
+    def __init__(self, pos_codes, latitudes, longitudes, cell_size=CELL_SIZE_DEG):
+        """
+        Args:
+            pos_codes (array-like): POS codes
+            latitudes (array-like): Latitudes, non-numeric values are skipped
+            longitudes (array-like): Longitudes, non-numeric values are skipped
+            cell_size (float): Cell size in degrees
+        """
+        pos_codes = np.asarray(pos_codes, dtype=str)
+        lats = pd.to_numeric(pd.Series(latitudes), errors='coerce').to_numpy(dtype=float)
+        lons = pd.to_numeric(pd.Series(longitudes), errors='coerce').to_numpy(dtype=float)
+
+        # Skip the 0.0/0.0 written for missing or malformed coordinates
+        valid = (
+            np.isfinite(lats) & np.isfinite(lons)
+            & ~((lats == 0) & (lons == 0))
+            & (np.abs(lats) <= 90) & (np.abs(lons) <= 180)
+        )
+        self.skipped = int((~valid).sum())
+
+        self.cell_size = float(cell_size)
+        cell_rows = np.floor(lats[valid] / self.cell_size).astype(np.int64)
+        cell_cols = np.floor(lons[valid] / self.cell_size).astype(np.int64)
+
+        order = np.lexsort((cell_cols, cell_rows))
+        self.pos_codes = pos_codes[valid][order]
+        self.latitudes = lats[valid][order]
+        self.longitudes = lons[valid][order]
+        self.cell_rows = cell_rows[order]
+        self.cell_cols = cell_cols[order]
+        self._build_cells()
+
+    def _build_cells(self):
+        # (cell_row, cell_col) -> (start, end) slice of the sorted points
+        cells = np.stack([self.cell_rows, self.cell_cols], axis=1)
+        starts = np.flatnonzero(np.r_[True, np.any(cells[1:] != cells[:-1], axis=1)])[:len(cells)]
+        ends = np.r_[starts[1:], len(cells)]
+        self.cells = {
+            (int(cells[start, 0]), int(cells[start, 1])): (int(start), int(end))
+            for start, end in zip(starts, ends)
+        }
+        self.max_abs_latitude = float(np.abs(self.latitudes).max()) if len(self.latitudes) else 0.0
+        if len(self.cells):
+            self.row_range = (int(self.cell_rows.min()), int(self.cell_rows.max()))
+            self.col_range = (int(self.cell_cols.min()), int(self.cell_cols.max()))
+
+    @classmethod
+    def from_csv(cls, path, cell_size=CELL_SIZE_DEG):
+        """
+        Build the index from the semicolon CSV output of get_data_sheet_one
+
+        Args:
+            path (str): pos_code_master_photo_data_1 output
+            cell_size (float): Cell size in degrees
+        """
+        df = pd.read_csv(path, sep=";", dtype=str, keep_default_na=False,
+                         usecols=['pos_code', 'latitude', 'longitude'])
+        return cls(df['pos_code'], df['latitude'], df['longitude'], cell_size)
+
+    def save(self, path):
+        """
+        Write the index to a .npz file
+
+        Args:
+            path (str): Output path
+        """
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                pos_codes=self.pos_codes,
+                latitudes=self.latitudes,
+                longitudes=self.longitudes,
+                cell_rows=self.cell_rows,
+                cell_cols=self.cell_cols,
+                cell_size=self.cell_size,
+                skipped=self.skipped
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index written by save, without re-parsing the CSV
+
+        Args:
+            path (str): .npz path
+        """
+        data = np.load(path)
+        index = cls.__new__(cls)
+        index.pos_codes = data['pos_codes']
+        index.latitudes = data['latitudes']
+        index.longitudes = data['longitudes']
+        index.cell_rows = data['cell_rows']
+        index.cell_cols = data['cell_cols']
+        index.cell_size = float(data['cell_size'])
+        index.skipped = int(data['skipped'])
+        index._build_cells()
+        return index
+
+    def __len__(self):
+        return len(self.pos_codes)
+
+    def _cell_points(self, cells):
+        slices = [self.cells[cell] for cell in cells if cell in self.cells]
+        if not slices:
+            return np.array([], dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in slices])
+
+    def _results(self, points, distances=None):
+        results = [
+            {'pos_code': pos_code, 'latitude': latitude, 'longitude': longitude}
+            for pos_code, latitude, longitude in zip(
+                self.pos_codes[points].tolist(), self.latitudes[points].tolist(), self.longitudes[points].tolist())
+        ]
+        if distances is not None:
+            for result, distance in zip(results, distances.tolist()):
+                result['distance_km'] = distance
+        return results
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Get every POS inside a bounding box, edges included
+
+        Args:
+            min_lat (float): South edge
+            min_lon (float): West edge
+            max_lat (float): North edge
+            max_lon (float): East edge
+
+        Returns:
+            list: pos_code, latitude and longitude dicts of the matching POS
+        """
+        if not len(self.cells):
+            return self._results(np.array([], dtype=np.int64))
+
+        row_lo = max(int(np.floor(min_lat / self.cell_size)), self.row_range[0])
+        row_hi = min(int(np.floor(max_lat / self.cell_size)), self.row_range[1])
+        col_lo = max(int(np.floor(min_lon / self.cell_size)), self.col_range[0])
+        col_hi = min(int(np.floor(max_lon / self.cell_size)), self.col_range[1])
+
+        cell_count = max(row_hi - row_lo + 1, 0) * max(col_hi - col_lo + 1, 0)
+        if cell_count > len(self.cells):
+            # Large areas: one vectorized pass is cheaper than walking the cells
+            points = np.arange(len(self.pos_codes))
+        else:
+            points = self._cell_points(
+                (row, col) for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1))
+
+        lats, lons = self.latitudes[points], self.longitudes[points]
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        return self._results(points[inside])
+
+    def nearest(self, lat, lon, k=5):
+        """
+        Get the k POS closest to a point
+
+        Args:
+            lat (float): Latitude of the point
+            lon (float): Longitude of the point
+            k (int): Number of POS to return
+
+        Returns:
+            list: pos_code, latitude, longitude and distance_km dicts, closest first
+        """
+        k = min(k, len(self.pos_codes))
+        if k <= 0:
+            return self._results(np.array([], dtype=np.int64), np.array([]))
+
+        row = int(np.floor(lat / self.cell_size))
+        col = int(np.floor(lon / self.cell_size))
+        # Points outside ring r are at least r cells away in latitude or longitude
+        cos_max_lat = np.cos(np.radians(max(self.max_abs_latitude, abs(lat))))
+        max_ring = max(
+            abs(row - self.row_range[0]), abs(row - self.row_range[1]),
+            abs(col - self.col_range[0]), abs(col - self.col_range[1])
+        )
+
+        # Rings before the one reaching the data bounding box are empty
+        first_ring = max(
+            self.row_range[0] - row, row - self.row_range[1],
+            self.col_range[0] - col, col - self.col_range[1], 0
+        )
+
+        candidate_points = []
+        candidate_distances = []
+        for ring in range(first_ring, max_ring + 1):
+            if 8 * ring > len(self.cells):
+                # Far from the data or a sparse grid: one vectorized pass over
+                # every point is cheaper than walking more cells than there are
+                candidate_points = [np.arange(len(self.pos_codes))]
+                candidate_distances = [haversine_km(lat, lon, self.latitudes, self.longitudes)]
+                break
+
+            if ring == 0:
+                ring_cells = [(row, col)]
+            else:
+                ring_cells = (
+                    [(row - ring, c) for c in range(col - ring, col + ring + 1)]
+                    + [(row + ring, c) for c in range(col - ring, col + ring + 1)]
+                    + [(r, col - ring) for r in range(row - ring + 1, row + ring)]
+                    + [(r, col + ring) for r in range(row - ring + 1, row + ring)]
+                )
+            points = self._cell_points(ring_cells)
+            if len(points):
+                candidate_points.append(points)
+                candidate_distances.append(
+                    haversine_km(lat, lon, self.latitudes[points], self.longitudes[points]))
+
+            if sum(len(points) for points in candidate_points) >= k:
+                kth = np.partition(np.concatenate(candidate_distances), k - 1)[k - 1]
+                gap = np.radians(ring * self.cell_size)
+                lower_bound = 2 * EARTH_RADIUS_KM * np.arcsin(min(cos_max_lat * np.sin(gap / 2), 1.0))
+                if kth <= lower_bound:
+                    break
+
+        points = np.concatenate(candidate_points)
+        distances = np.concatenate(candidate_distances)
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.argsort(distances[closest], kind='stable')]
+        return self._results(points[closest], distances[closest])
+
+if __name__ == "__main__":
+    # Imported here so the index can be built and queried without gspread
+    from get_data_gsheet_v2_used_in_prod import OUTPUT_DIR, OUTPUT_SUFFIX, sheet_output_path
+
+    input_path = sheet_output_path(load_sheet_spec(SHEET_SPEC_NAME))
+    index_path = os.path.join(OUTPUT_DIR, f"{INDEX_OUTPUT}{OUTPUT_SUFFIX}.npz")
+
+    spatial_index = PosSpatialIndex.from_csv(input_path)
+    spatial_index.save(index_path)
+    print(f"Skipped {spatial_index.skipped} POS without valid coordinates")
+    print(f"Successfully saved a spatial index of {len(spatial_index)} POS in {len(spatial_index.cells)} cells to {index_path}")
@@ -0,0 +1,174 @@
+"""
+Config-driven transform engine for the gsheet jobs.
+Each sheet is described by a JSON spec in sheet_specs/: where to read it,
+which source columns to keep and the list of stages that turn them into the
+output. Stages are plain functions registered by name, so a new sheet only
+needs a new spec file as long as it reuses existing stages.
+
+Spec keys:
+    name             label used in log messages, e.g. "Sheet 1"
+    spreadsheet_id   id of the spreadsheet
+    gids             worksheet gids to export
+    output           output file name without suffix and extension
+    columns          source column prefixes to keep, in output order
+    stages           [{"stage": <registered name>, <stage arguments>...}]
+    incremental      optional, only fetch and append rows added since the last run,
+                     with a full refresh every INCREMENTAL_FULL_REFRESH_HOURS
+    dedup            optional, keep only the latest upload per POS code
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from etl_metrics import NO_METRICS
+
+SHEET_SPEC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sheet_specs')
+
+REQUIRED_SPEC_KEYS = ['name', 'spreadsheet_id', 'gids', 'output', 'columns', 'stages']
+
+# Stage name -> function(df, spec, **arguments) returning the new DataFrame
+STAGES = {}
+
+def register_stage(name):
+    """
+    Decorator adding a transform stage to the registry
+
+    Args:
+        name (str): Name used in the "stage" field of the specs
+    """
+    def decorator(func):
+        STAGES[name] = func
+        return func
+    return decorator
+
+def load_sheet_spec(spec_path):
+    """
+    Load and check a sheet spec
+
+    Args:
+        spec_path (str): path of the json spec, or a spec name inside SHEET_SPEC_DIR
+
+    Returns:
+        dict: The sheet spec
+    """
+    if not os.path.exists(spec_path):
+        spec_path = os.path.join(SHEET_SPEC_DIR, f"{spec_path}.json")
+    with open(spec_path) as f:
+        spec = json.load(f)
+
+    missing = [key for key in REQUIRED_SPEC_KEYS if key not in spec]
+    if missing:
+        raise ValueError(f"Sheet spec {spec_path} is missing: {', '.join(missing)}")
+    return spec
+
+def load_sheet_specs(spec_dir=SHEET_SPEC_DIR):
+    """
+    Load every sheet spec of a directory, in file name order
+
+    Args:
+        spec_dir (str): directory of json specs
+
+    Returns:
+        list: Sheet specs
+    """
+    return [
+        load_sheet_spec(os.path.join(spec_dir, file_name))
+        for file_name in sorted(os.listdir(spec_dir))
+        if file_name.endswith('.json')
+    ]
+
+def check_stages(spec):
+    """
+    Fail before any fetch if a spec uses a stage that is not registered
+
+    Args:
+        spec (dict): Sheet spec
+    """
+    unknown = [step['stage'] for step in spec['stages'] if step['stage'] not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage in {spec['name']} spec: {', '.join(unknown)}")
+
+def make_headers_unique(headers):
+    """
+    Make header names unique by appending numbers to duplicates.
+
+    Args:
+        headers (list): List of header names
+
+    Returns:
+        list: List of unique header names
+    """
+    seen = {}
+    unique_headers = []
+
+    for header in headers:
+        if header in seen:
+            seen[header] += 1
+            unique_headers.append(f"{header}_{seen[header]}")
+        else:
+            seen[header] = 0
+            unique_headers.append(header)
+
+    return unique_headers
+
+def select_source_columns(all_values, prefixes):
+    """
+    Build a DataFrame of the source columns starting with one of the prefixes.
+    Only the kept columns are materialized, the rest of the sheet is never
+    turned into a DataFrame.
+
+    Args:
+        all_values (list): Worksheet rows, the first one being the header
+        prefixes (list): Column prefixes to keep, in output order
+
+    Returns:
+        pd.DataFrame: Kept columns, or None if none of them were found
+    """
+    headers = make_headers_unique(all_values[0])
+    data_rows = all_values[1:]
+
+    selected = []
+    for prefix in prefixes:
+        selected.extend(i for i, header in enumerate(headers) if header.startswith(prefix))
+
+    if not selected:
+        print(f"Warning: None of the specified columns were found in the sheet")
+        print(f"Available columns: {', '.join(headers)}")
+        return None
+
+    width = len(headers)
+    if any(len(row) != width for row in data_rows):
+        data_rows = [(list(row) + [''] * width)[:width] for row in data_rows]
+    data = np.array(data_rows, dtype=object).reshape(len(data_rows), width)
+
+    return pd.DataFrame({headers[i]: data[:, i] for i in selected})
+
+def transform_sheet(spec, all_values, metrics=NO_METRICS, **metric_fields):
+    """
+    Turn the raw rows of a worksheet into the output DataFrame of its spec
+
+    Args:
+        spec (dict): Sheet spec
+        all_values (list): Worksheet rows, the first one being the header
+        metrics (MetricsRecorder): records the frame build and every stage
+        **metric_fields: extra fields of the metrics lines, e.g. gid
+
+    Returns:
+        pd.DataFrame: Transformed rows, or None if none of the columns were found
+    """
+    with metrics.stage('build_frame', sheet=spec['name'], **metric_fields) as record:
+        record['rows_in'] = max(len(all_values) - 1, 0)
+        df = select_source_columns(all_values, spec['columns'])
+        record['rows_out'] = None if df is None else len(df)
+        record['columns_out'] = None if df is None else len(df.columns)
+    if df is None:
+        return None
+
+    for step in spec['stages']:
+        arguments = {key: value for key, value in step.items() if key != 'stage'}
+        with metrics.stage(f"stage:{step['stage']}", sheet=spec['name'], **metric_fields) as record:
+            record['rows_in'] = len(df)
+            df = STAGES[step['stage']](df, spec, **arguments)
+            record['rows_out'] = len(df)
+
+    return df
@@ -0,0 +1,204 @@
+"""
+Quota-aware request layer for the Sheets API.
+Every request goes through a token bucket refilled at the read quota, and
+throttled (429) or failed (5xx) requests are retried with jittered
+exponential backoff instead of failing the whole worksheet.
+"""
+import random
+import threading
+import time
+from urllib.error import URLError
+from etl_metrics import NO_METRICS
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Requests that can be sent back to back before the steady rate applies.
+# A full minute of tokens would let a run start with a minute's quota at once
+# and then be throttled by the server's own per-minute window.
+DEFAULT_BURST = 5
+
+# Errors raised before any response arrives: dropped connections and timeouts
+NETWORK_ERRORS = (ConnectionError, TimeoutError, URLError)
+try:
+    from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+    NETWORK_ERRORS += (RequestsConnectionError, RequestsTimeout)
+except ImportError:
+    pass
+
+def error_status_code(error):
+    """
+    HTTP status of a failed Sheets request
+
+    Args:
+        error (Exception): exception raised by gspread
+
+    Returns:
+        int: status code, None if the error carries no HTTP response
+    """
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+def is_retryable(error):
+    """
+    Whether a failed request is worth retrying: throttling, server errors and dropped connections
+
+    Args:
+        error (Exception): exception raised by the request
+    """
+    status_code = error_status_code(error)
+    if status_code is None:
+        return isinstance(error, NETWORK_ERRORS)
+    return status_code in RETRYABLE_STATUS_CODES
+
+def retry_after_seconds(error):
+    """
+    Delay asked by the server in a Retry-After header
+
+    Args:
+        error (Exception): exception raised by the request
+
+    Returns:
+        float: seconds to wait, None if there is no usable header
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at rate_per_minute tokens per minute,
+    holding at most capacity tokens (DEFAULT_BURST by default).
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1, min(DEFAULT_BURST, rate_per_minute))
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, waiting until one is available
+
+        Returns:
+            float: seconds waited
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now so concurrent callers queue up behind it
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+class RequestScheduler:
+    """
+    Runs Sheets API calls under the rate limit and retries transient failures.
+    """
+
+    def __init__(self, rate_per_minute=60, max_retries=5, base_delay=1.0, max_delay=64.0,
+                 metrics=NO_METRICS, clock=time.monotonic, sleep=time.sleep, jitter=random.random, burst=None):
+        self.bucket = TokenBucket(rate_per_minute, burst, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+        self.sleep = sleep
+        self.jitter = jitter
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def backoff_delay(self, attempt, error):
+        """
+        Full-jitter exponential backoff, or the server's Retry-After if longer
+
+        Args:
+            attempt (int): number of the failed attempt, starting at 0
+            error (Exception): exception raised by the request
+        """
+        delay = self.jitter() * min(self.max_delay, self.base_delay * 2 ** attempt)
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func with rate limiting and retries
+
+        Args:
+            func (callable): gspread method making one API request
+            *args, **kwargs: arguments of func
+
+        Returns:
+            The result of func, the last error is raised once the retries are used up
+        """
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            with self._lock:
+                self.requests += 1
+                self.throttled_seconds += waited
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                with self._lock:
+                    self.retries += 1
+                    self.throttled_seconds += delay
+                print(f"Warning: Sheets request failed ({error_status_code(e) or type(e).__name__}), "
+                      f"retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                self.metrics.emit({
+                    'stage': 'retry', 'request': getattr(func, '__name__', str(func)),
+                    'status_code': error_status_code(e), 'attempt': attempt + 1, 'delay_s': round(delay, 3)
+                })
+                self.sleep(delay)
+
+    def stats(self):
+        """
+        Request counters of the run
+
+        Returns:
+            dict: requests, retries and seconds spent waiting on the rate limit or backoff
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled_s': round(self.throttled_seconds, 3)
+            }
+
+class ScheduledProxy:
+    """
+    Wraps a gspread object so that its method calls go through a RequestScheduler.
+    Attributes that are not methods, such as id, title or row_count, are passed through.
+    """
+
+    def __init__(self, target, scheduler):
+        self._target = target
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(attribute, *args, **kwargs)
+        scheduled.__name__ = name
+        return scheduled
@@ -0,0 +1,94 @@
+"""
+Content-hash snapshot cache for the gsheet jobs.
+The raw worksheet rows, together with the job config they are transformed
+with, are hashed and compared with a local manifest, so a worksheet that has
+not changed since the last run is neither transformed nor written again and
+its previous output file is kept.
+"""
+import hashlib
+import os
+from json_state import load_json_state, save_json_state
+
+def hash_rows(rows, digest=None):
+    """
+    Feed worksheet rows into a content hash
+
+    Args:
+        rows (list): Rows of cell values, e.g. the output of get_all_values()
+        digest: hashlib object to update, a new blake2b one is created if omitted
+
+    Returns:
+        hashlib object: Updated digest, call hexdigest() for the snapshot hash
+    """
+    if digest is None:
+        digest = hashlib.blake2b(digest_size=20)
+    for row in rows:
+        digest.update('\x1f'.join(row).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest
+
+def load_manifest(manifest_path):
+    """
+    Load the snapshot manifest
+
+    Args:
+        manifest_path (str): path of the json manifest
+
+    Returns:
+        dict: "<spreadsheet_id>:<gid>" -> snapshot entry, empty if there is no manifest yet
+    """
+    return load_json_state(manifest_path)
+
+def save_manifest(manifest, manifest_path):
+    """
+    Write the snapshot manifest
+
+    Args:
+        manifest (dict): entries as returned by load_manifest
+        manifest_path (str): path of the json manifest
+    """
+    save_json_state(manifest, manifest_path)
+
+def is_unchanged(manifest, key, snapshot_hash, output_format, job_output_path):
+    """
+    Check whether a worksheet matches its last snapshot and the output is still there
+
+    Args:
+        manifest (dict): entries as returned by load_manifest
+        key (str): "<spreadsheet_id>:<gid>"
+        snapshot_hash (str): hex digest of the current worksheet rows and job config
+        output_format (str): output format the job would write now
+        job_output_path (str): output path the job would write to now
+
+    Returns:
+        bool: True if the transform and write can be skipped
+    """
+    entry = manifest.get(key)
+    return (
+        entry is not None
+        and entry['hash'] == snapshot_hash
+        and entry.get('output_format') == output_format
+        and entry.get('job_output_path') == job_output_path
+        and os.path.exists(entry['output_path'])
+    )
+
+def record_snapshot(manifest, key, snapshot_hash, row_count, output_path, output_format, job_output_path):
+    """
+    Remember the snapshot a worksheet's output was written from
+
+    Args:
+        manifest (dict): entries as returned by load_manifest
+        key (str): "<spreadsheet_id>:<gid>"
+        snapshot_hash (str): hex digest of the worksheet rows
+        row_count (int): number of data rows in the worksheet
+        output_path (str): file or directory that was written
+        output_format (str): format of the output
+        job_output_path (str): output path of the job, before columnar formats swap its extension
+    """
+    manifest[key] = {
+        'hash': snapshot_hash,
+        'row_count': row_count,
+        'output_path': output_path,
+        'output_format': output_format,
+        'job_output_path': job_output_path
+    }
@@ -136,4 +136,5 @@ def main():
     print(f"You left with ${balance}")
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
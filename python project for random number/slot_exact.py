@@ -0,0 +1,119 @@
+"""
+Exact RTP and payout distribution of the slot machine of main.py.
+Columns are independent and each one is an ordered draw without replacement
+from the symbol_count pool, so the distribution of the first `lines` rows of
+a column has at most len(symbols) ** lines outcomes. Columns are folded in
+one at a time, keeping for every line the symbol all the columns so far
+agree on (or None), which gives the exact probability of every payout as a
+Fraction. Results are cached per machine config.
+
+Usage:
+    python slot_exact.py
+"""
+from fractions import Fraction
+from functools import lru_cache
+import itertools
+from main import COLS, MAX_LINES, ROWS, symbol_count, symbol_value
+
+def column_distribution(lines, symbols):
+    """
+    Probability of every symbol sequence in the first lines rows of a column
+
+    Args:
+        lines (int): Number of rows drawn
+        symbols (tuple): (symbol, number of copies on a reel) pairs
+
+    Returns:
+        dict: tuple of symbols -> Fraction
+    """
+    total = sum(count for _, count in symbols)
+    distribution = {}
+    for sequence in itertools.product([symbol for symbol, _ in symbols], repeat=lines):
+        left = dict(symbols)
+        probability = Fraction(1)
+        for drawn, symbol in enumerate(sequence):
+            if left[symbol] == 0:
+                probability = 0
+                break
+            probability *= Fraction(left[symbol], total - drawn)
+            left[symbol] -= 1
+        if probability:
+            distribution[sequence] = probability
+    return distribution
+
+@lru_cache(maxsize=None)
+def _payout_distribution(lines, rows, cols, symbols, values):
+    if not 1 <= lines <= rows:
+        raise ValueError(f"lines must be between 1 and {rows}, got {lines}")
+    if rows > sum(count for _, count in symbols):
+        raise ValueError(f"A column of {rows} rows needs at least {rows} symbols on the reel")
+
+    column = column_distribution(lines, symbols)
+    # Per line: the symbol every column so far shows, None once they differ
+    states = dict(column)
+    for _ in range(cols - 1):
+        folded = {}
+        for state, state_probability in states.items():
+            for sequence, probability in column.items():
+                new_state = tuple(
+                    symbol if symbol == drawn else None
+                    for symbol, drawn in zip(state, sequence)
+                )
+                folded[new_state] = folded.get(new_state, 0) + state_probability * probability
+        states = folded
+
+    value_of = dict(values)
+    distribution = {}
+    for state, probability in states.items():
+        payout = sum(value_of[symbol] for symbol in state if symbol is not None)
+        distribution[payout] = distribution.get(payout, 0) + probability
+    return tuple(sorted(distribution.items()))
+
+def config_key(rows=ROWS, cols=COLS, symbols=symbol_count, values=symbol_value):
+    """
+    Hashable form of a machine config, used as the cache key
+    """
+    return rows, cols, tuple(symbols.items()), tuple(sorted(values.items()))
+
+def payout_distribution(lines=MAX_LINES, rows=ROWS, cols=COLS, symbols=symbol_count, values=symbol_value):
+    """
+    Exact distribution of the payout of one spin, for a bet of 1 on each line
+
+    Args:
+        lines (int): Number of lines bet on
+        rows (int): Rows of the machine
+        cols (int): Columns of the machine
+        symbols (dict): symbol -> number of copies on a reel
+        values (dict): symbol -> payout multiplier of a winning line
+
+    Returns:
+        dict: payout -> probability as a Fraction
+    """
+    return dict(_payout_distribution(lines, *config_key(rows, cols, symbols, values)))
+
+def exact_rtp(lines=MAX_LINES, rows=ROWS, cols=COLS, symbols=symbol_count, values=symbol_value):
+    """
+    Exact counterpart of slot_simulator.summarize
+
+    Returns:
+        dict: rtp (payout per unit bet), hit_frequency, variance of the payout per
+        unit bet of one spin, all as Fractions, and the payout distribution
+    """
+    distribution = payout_distribution(lines, rows, cols, symbols, values)
+    mean = sum(payout * probability for payout, probability in distribution.items())
+    variance = sum(payout * payout * probability for payout, probability in distribution.items()) - mean ** 2
+    return {
+        'lines': lines,
+        'rtp': mean / lines,
+        'hit_frequency': 1 - distribution.get(0, 0),
+        'variance': variance / lines ** 2,
+        'distribution': distribution
+    }
+
+if __name__ == "__main__":
+    for lines in range(1, MAX_LINES + 1):
+        result = exact_rtp(lines)
+        print(f"{lines} line(s): RTP {float(result['rtp']):.4%} ({result['rtp']}), "
+              f"hit frequency {float(result['hit_frequency']):.4%}, variance {float(result['variance']):.4f}")
+        for payout, probability in result['distribution'].items():
+            print(f"  pays {payout:>3} x bet: {float(probability):.6f}")
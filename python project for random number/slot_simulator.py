@@ -0,0 +1,172 @@
+"""
+Monte Carlo RTP simulator for the slot machine of main.py.
+Spins are generated in batches as NumPy arrays: every column draws ROWS
+symbols without replacement from the symbol_count pool, as
+get_slot_machine_spin does, and the lines are scored on the whole batch at
+once. Work can be split over processes, each with its own RNG stream spawned
+from one seed, so a run is reproducible for a given seed and worker count.
+
+Usage:
+    python slot_simulator.py --spins 10000000 --workers 4 --seed 42
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import numpy as np
+from main import COLS, MAX_LINES, ROWS, symbol_count, symbol_value
+
+BATCH_SPINS = 100_000
+
+def symbol_pool(symbols):
+    """
+    Args:
+        symbols (dict): symbol -> number of copies on a reel
+
+    Returns:
+        tuple: list of the symbols, and the index of the symbol of every pool slot
+    """
+    names = list(symbols)
+    return names, np.repeat(np.arange(len(names)), [symbols[name] for name in names])
+
+def spin_batch(rng, spins, rows=ROWS, cols=COLS, symbols=symbol_count):
+    """
+    Draw a batch of spins
+
+    Args:
+        rng (np.random.Generator): Random generator
+        spins (int): Number of spins
+        rows (int): Rows of the machine
+        cols (int): Columns of the machine
+        symbols (dict): symbol -> number of copies on a reel
+
+    Returns:
+        np.ndarray: Symbol indices of shape (spins, cols, rows)
+    """
+    _, pool = symbol_pool(symbols)
+    reels = spins * cols
+    # Partial Fisher-Yates shuffle of every column: only the first rows slots are drawn
+    slots = np.tile(np.arange(len(pool), dtype=np.int16), (reels, 1))
+    reel = np.arange(reels)
+    for row in range(rows):
+        pick = rng.integers(row, len(pool), reels)
+        picked = slots[reel, pick]
+        slots[reel, pick] = slots[:, row]
+        slots[:, row] = picked
+    return pool[slots[:, :rows]].reshape(spins, cols, rows)
+
+def line_payouts(grid, lines, values):
+    """
+    Payout of every spin for a bet of 1 on each of the first lines rows
+
+    Args:
+        grid (np.ndarray): Symbol indices of shape (spins, cols, rows)
+        lines (int): Number of lines bet on
+        values (np.ndarray): Payout multiplier of every symbol index
+
+    Returns:
+        tuple: payouts of shape (spins,) and number of winning lines of every spin
+    """
+    rows = grid[:, :, :lines]
+    wins = (rows == rows[:, :1, :]).all(axis=1)
+    payouts = (wins * values[rows[:, 0, :]]).sum(axis=1)
+    return payouts, wins.sum(axis=1)
+
+def simulate(spins, lines=MAX_LINES, seed=None, rows=ROWS, cols=COLS, symbols=symbol_count,
+             values=symbol_value, batch_spins=BATCH_SPINS):
+    """
+    Simulate spins in batches and accumulate the statistics
+
+    Args:
+        spins (int): Number of spins
+        lines (int): Number of lines bet on, each with the same bet
+        seed (int or np.random.SeedSequence): Seed of the RNG stream
+
+    Returns:
+        dict: spins, lines, sums of the payout per spin and its square, and the spins with a win
+    """
+    rng = np.random.default_rng(seed)
+    names, _ = symbol_pool(symbols)
+    value_of = np.array([values[name] for name in names], dtype=np.int64)
+
+    totals = {'spins': 0, 'lines': lines, 'payout': 0, 'payout_sq': 0, 'hits': 0}
+    while totals['spins'] < spins:
+        batch = min(batch_spins, spins - totals['spins'])
+        payouts, winning_lines = line_payouts(spin_batch(rng, batch, rows, cols, symbols), lines, value_of)
+        totals['spins'] += batch
+        totals['payout'] += int(payouts.sum())
+        totals['payout_sq'] += int((payouts * payouts).sum())
+        totals['hits'] += int(np.count_nonzero(winning_lines))
+    return totals
+
+def _simulate(task):
+    return simulate(*task)
+
+def summarize(totals):
+    """
+    RTP, hit frequency and variance from the accumulated statistics
+
+    Returns:
+        dict: rtp (payout per unit bet), its standard error, hit_frequency and
+        variance of the payout per unit bet of one spin
+    """
+    spins, stake = totals['spins'], totals['lines']
+    mean = totals['payout'] / spins
+    variance = totals['payout_sq'] / spins - mean ** 2
+    return {
+        'spins': spins,
+        'lines': stake,
+        'rtp': mean / stake,
+        'rtp_std_error': float(np.sqrt(variance / spins)) / stake,
+        'hit_frequency': totals['hits'] / spins,
+        'variance': variance / stake ** 2
+    }
+
+def simulate_parallel(spins, lines=MAX_LINES, seed=None, workers=None, **config):
+    """
+    Split the spins over processes with independent RNG streams
+
+    Args:
+        spins (int): Number of spins
+        lines (int): Number of lines bet on
+        seed (int): Root seed, the worker streams are spawned from it
+        workers (int): Number of processes, the number of cores if None
+        **config: rows, cols, symbols, values or batch_spins of simulate
+
+    Returns:
+        dict: summary of all the spins, see summarize
+    """
+    workers = workers or os.cpu_count()
+    streams = np.random.SeedSequence(seed).spawn(workers)
+    shares = [spins // workers + (i < spins % workers) for i in range(workers)]
+    tasks = [
+        (share, lines, stream, config.get('rows', ROWS), config.get('cols', COLS),
+         config.get('symbols', symbol_count), config.get('values', symbol_value),
+         config.get('batch_spins', BATCH_SPINS))
+        for share, stream in zip(shares, streams) if share
+    ]
+
+    if workers == 1:
+        results = [_simulate(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_simulate, tasks))
+
+    totals = {'spins': 0, 'lines': lines, 'payout': 0, 'payout_sq': 0, 'hits': 0}
+    for result in results:
+        for key in ('spins', 'payout', 'payout_sq', 'hits'):
+            totals[key] += result[key]
+    return summarize(totals)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo RTP of the slot machine")
+    parser.add_argument('--spins', type=int, default=1_000_000)
+    parser.add_argument('--lines', type=int, nargs='+', default=list(range(1, MAX_LINES + 1)))
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        summary = simulate_parallel(args.spins, lines, args.seed, args.workers)
+        print(f"{lines} line(s), {summary['spins']} spins: RTP {summary['rtp']:.4%} "
+              f"(+/- {1.96 * summary['rtp_std_error']:.4%}), hit frequency {summary['hit_frequency']:.4%}, "
+              f"variance {summary['variance']:.4f}")